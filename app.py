@@ -1,40 +1,63 @@
 from flask import Flask
 from flask_smorest import Api
+from config import load_config
 from extensions import db, limiter
-from dotenv import load_dotenv
-from routes.weather_routes import weather_blp
-import os
 
-load_dotenv()
 
-def create_app():
+def create_app(config: dict = None):
+    """Build the app from the environment, with `config` overriding any setting.
+
+    Configuration is loaded once, before the blueprints are imported since
+    their modules read settings at import time. Building the app creates no
+    tables and opens no connections: the schema is created by `flask init-db`
+    and the Redis, database and upstream pools on first use (see /ready).
+    """
+    settings = load_config()
+    from routes.weather_routes import weather_blp
+    from routes.metrics_routes import metrics_blp
+    from routes.history_routes import history_blp
+    from routes.health_routes import health_blp
+    from service.metrics import metrics
+    from service.weather_service import init_write_behind
+    from service.retention import prune_weather_command
+    from service.prefetch import prefetch_weather_command
+    from service.bootstrap import init_db_command
+
     app = Flask(__name__)
-    app.config["PROPAGATE_EXCEPTIONS"] = True
-    app.config["API_TITLE"] = "Weather REST API"
-    app.config["API_VERSION"] = "v1"
-    app.config["OPENAPI_VERSION"] = "3.0.3"
-    app.config["OPENAPI_URL_PREFIX"] = "/"
-    app.config["OPENAPI_SWAGGER_UI_PATH"] = "/swagger-ui"
-    app.config["OPENAPI_SWAGGER_UI_URL"] = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
-    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL")
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-    app.config['JWT_SECRET_KEY'] = os.getenv("JWT_SECRET")
+    app.config.update(settings)
+    app.config.update(config or {})
 
     db.init_app(app)
     api = Api(app)
     limiter.init_app(app)
-    
-
-    with app.app_context():
-        db.create_all()
+    metrics.init_app(app)
+    init_write_behind(app)
 
     api.register_blueprint(weather_blp)
+    api.register_blueprint(metrics_blp)
+    api.register_blueprint(history_blp)
+    api.register_blueprint(health_blp)
+    app.cli.add_command(prune_weather_command)
+    app.cli.add_command(prefetch_weather_command)
+    app.cli.add_command(init_db_command)
     return app
 
-# Create app instance for hypercorn
-app = create_app()
+
+def __getattr__(name):
+    # The app instance for `hypercorn app:app` and `flask --app app` is built
+    # on first lookup, so importing this module (e.g. for create_app) is cheap
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
     # Use hypercorn for ASGI async support: hypercorn app:app --bind 0.0.0.0:5000
     # For development with Flask dev server:
+    from service.bootstrap import init_db
+
+    app = create_app()
+    with app.app_context():
+        init_db()
     app.run(debug=True, port=5000, use_reloader=False)
@@ -0,0 +1,20 @@
+"""The weather app as bench_load.py serves it: `hypercorn bench_app:app`, run from benchmarks/.
+
+Rate limits are switched off so they do not cap the measured throughput.
+The schema is created beforehand by bench_load.py with `flask init-db`.
+With BENCH_FAKE_REDIS=1 every Redis client in the process talks to one
+in-memory fakeredis server instead of REDIS_URL; that state is private to
+the process, so it only makes sense with a single worker.
+"""
+import os
+
+from common import use_fake_redis
+
+if os.getenv("BENCH_FAKE_REDIS") == "1":
+    use_fake_redis()
+
+from extensions import limiter
+from app import create_app
+
+app = create_app({"RATELIMIT_ENABLED": False})
+limiter.enabled = False
@@ -0,0 +1,63 @@
+"""Cache-hit latency: decode + rebuild + re-encode vs serving the stored body.
+
+    python benchmarks/bench_cache_hit.py [--iterations N] [--redis]
+
+With --redis the Redis GET is included, using REDIS_URL.
+"""
+import argparse
+import json
+
+from common import report, time_calls
+from payloads import make_timeline
+
+from models.weather import Weather
+from routes.weather_routes import success_envelope
+from service.bulk_writer import build_rows, weather_from_rows
+from service.weather_service import encode_body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--redis", action="store_true")
+    args = parser.parse_args()
+
+    payload = make_timeline()
+    raw_payload = json.dumps(payload)
+    body = encode_body(weather_from_rows(*build_rows(payload)).to_dict())
+
+    get_raw = lambda: raw_payload
+    get_body = lambda: body
+    if args.redis:
+        from extensions import get_redis_client
+        client = get_redis_client(decode_responses=False)
+        client.set("bench:raw", raw_payload)
+        client.set("bench:body", body)
+        get_raw = lambda: client.get("bench:raw")
+        get_body = lambda: client.get("bench:body")
+
+    def legacy_hit():
+        data = json.loads(get_raw())
+        weather = Weather(
+            query_cost=data.get('queryCost'),
+            latitude=data.get('latitude'),
+            longitude=data.get('longitude'),
+            resolved_address=data.get('resolvedAddress'),
+            address=data.get('address'),
+            timezone=data.get('timezone'),
+            tzoffset=data.get('tzoffset'),
+            description=data.get('description'),
+            alerts=data.get('alerts')
+        )
+        return json.dumps({"status": True, "data": weather.to_dict()}).encode()
+
+    def body_hit():
+        return success_envelope(get_body())
+
+    print(f"payload {len(raw_payload)} bytes, cached body {len(body)} bytes")
+    report("legacy hit (partial shape)", time_calls(legacy_hit, args.iterations))
+    report("body hit (full shape)", time_calls(body_hit, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Row-per-hour vs compact hourly blocks: storage size, save and read latency.
+
+    python benchmarks/bench_hourly_storage.py [--forecasts N] [--iterations N]
+
+Uses BENCH_DATABASE_URL (default: in-memory SQLite). Table sizes come from
+pg_total_relation_size on Postgres and the dbstat table on SQLite.
+"""
+import argparse
+import os
+
+from common import report, time_calls
+from payloads import make_timeline
+
+from flask import Flask
+from sqlalchemy import text
+from extensions import db
+from service.bulk_writer import BulkWeatherWriter
+from service.weather_repository import WeatherRepository
+
+TABLES = ("current_conditions", "hourly_block")
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("BENCH_DATABASE_URL", "sqlite://")
+    db.init_app(app)
+    return app
+
+
+def table_bytes():
+    sizes = {}
+    for table in TABLES:
+        if db.engine.dialect.name == "postgresql":
+            sizes[table] = db.session.execute(text(f"SELECT pg_total_relation_size('{table}')")).scalar()
+        else:
+            # dbstat counts index pages under the index name, so include them
+            sizes[table] = db.session.execute(text(
+                "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = :table "
+                "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table)"
+            ), {"table": table}).scalar()
+    return sizes
+
+
+def hours_of(weather):
+    return [
+        {key: value for key, value in hour.items() if key != 'id'}
+        for day in weather.to_dict()['days'] for hour in day.get('hours', [])
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--forecasts", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    payload = make_timeline()
+    app = make_app()
+    decoded = {}
+    with app.app_context():
+        for mode in ("rows", "compact"):
+            db.drop_all()
+            db.create_all()
+            writer = BulkWeatherWriter(db.session, hourly_storage=mode)
+            ids = []
+
+            def save():
+                ids.append(writer.save(payload)[0]['id'])
+
+            save_samples = time_calls(save, args.forecasts, warmup=0)
+            sizes = table_bytes()
+
+            def read():
+                db.session.expunge_all()
+                return WeatherRepository(db.session).get_tree(ids[0]).to_dict()
+
+            read_samples = time_calls(read, args.iterations)
+            db.session.expunge_all()
+            decoded[mode] = hours_of(WeatherRepository(db.session).get_tree(ids[0]))
+
+            print(f"{mode}: {args.forecasts} forecasts, table bytes {sizes} total {sum(sizes.values())}")
+            report(f"{mode} save", save_samples)
+            report(f"{mode} read + to_dict", read_samples)
+
+    print("compact hours identical to row hours (ids aside):", decoded["rows"] == decoded["compact"])
+
+
+if __name__ == "__main__":
+    main()
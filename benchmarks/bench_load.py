@@ -0,0 +1,208 @@
+"""End-to-end load test of POST /weather through hypercorn at mixed cache hit ratios.
+
+    python benchmarks/bench_load.py [--requests N] [--concurrency N] [--hit-ratios 0,0.5,0.9,1]
+                                    [--workers N] [--upstream-latency-ms MS] [--json results.json]
+
+Everything runs locally: the Visual Crossing API is replaced by
+stub_upstream.py, Redis by fakeredis inside the app process (or
+--redis-url for a real one), and Postgres by a SQLite file (or
+--database-url). A set of hot locations is warmed first; each request then
+hits one of them with probability equal to the hit ratio and otherwise asks
+for a location nobody has requested yet.
+
+Reports throughput and p50/p95/p99 latency per hit ratio, plus the peak
+memory a hit and a miss allocate, measured in-process with tracemalloc.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import Results, allocations_per_call, percentile, summarize
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+API_VERSION = "/api/v1"
+HOT_LOCATIONS = 32
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{process.args} exited with {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout}s")
+
+
+class Locations:
+    """Coordinates that each fall in their own cache cell and are never handed out twice"""
+
+    def __init__(self):
+        self.next_index = 0
+
+    def fresh(self):
+        index = self.next_index
+        self.next_index += 1
+        return round(-79.995 + (index % 16000) * 0.01, 3), round(10.005 + (index // 16000) * 0.01, 3)
+
+
+def body_for(location):
+    lat, long = location
+    return {"latitude": lat, "longitiude": long}
+
+
+async def run_load(base_url, requests, concurrency):
+    """POST every (location, is_hit) in `requests` with `concurrency` clients; returns timings"""
+    latencies = {True: [], False: []}
+    errors = 0
+    pending = iter(requests)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        async def worker():
+            nonlocal errors
+            for location, is_hit in pending:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(f"{API_VERSION}/weather", json=body_for(location))
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies[is_hit].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def measure_allocations(env, hot, locations):
+    """Peak KiB allocated by one hit and one miss, running the app in this process"""
+    os.environ.update(env)
+    from bench_app import app
+
+    client = app.test_client()
+    hit = lambda: client.post(f"{API_VERSION}/weather", json=body_for(hot[0]))
+    miss = lambda: client.post(f"{API_VERSION}/weather", json=body_for(locations.fresh()))
+    return allocations_per_call(hit), allocations_per_call(miss, iterations=10)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500, help="requests per hit ratio")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--hit-ratios", default="0,0.5,0.9,1")
+    parser.add_argument("--workers", type=int, default=1, help="hypercorn worker processes")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0)
+    parser.add_argument("--redis-url", help="use this Redis instead of fakeredis in the app process")
+    parser.add_argument("--database-url", help="use this database instead of a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.workers > 1 and not args.redis_url:
+        parser.error("--workers > 1 needs --redis-url: fakeredis state is private to each worker")
+
+    ratios = [float(ratio) for ratio in args.hit_ratios.split(",")]
+    workdir = tempfile.mkdtemp(prefix="weather-bench-")
+    upstream_port = free_port()
+    app_port = free_port()
+    env = {
+        "REDIS_URL": args.redis_url or "redis://fakeredis",
+        "BENCH_FAKE_REDIS": "0" if args.redis_url else "1",
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "WEATHER_API_URL": f"http://127.0.0.1:{upstream_port}",
+        "WEATHER_API_KEY": "bench",
+        "API_VERSION": API_VERSION,
+    }
+
+    processes = []
+    results = Results("load", {
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'workers': args.workers,
+        'upstream_latency_ms': args.upstream_latency_ms,
+        'redis': "redis" if args.redis_url else "fakeredis",
+        'database': env["DATABASE_URL"].split(":")[0]
+    })
+    try:
+        # Workers do not create the schema; bootstrap it once, as a deploy would
+        subprocess.run(
+            [sys.executable, "-m", "flask", "--app", "app", "init-db"],
+            cwd=os.path.dirname(BENCH_DIR), env={**os.environ, **env}, check=True, stdout=subprocess.DEVNULL
+        )
+        processes.append(subprocess.Popen(
+            [sys.executable, os.path.join(BENCH_DIR, "stub_upstream.py"),
+             "--port", str(upstream_port), "--latency-ms", str(args.upstream_latency_ms)],
+        ))
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "hypercorn", "bench_app:app",
+             "--bind", f"127.0.0.1:{app_port}", "--workers", str(args.workers)],
+            cwd=BENCH_DIR, env={**os.environ, **env}, stdout=subprocess.DEVNULL
+        ))
+        wait_for_port(upstream_port, processes[0])
+        wait_for_port(app_port, processes[1])
+        base_url = f"http://127.0.0.1:{app_port}"
+
+        locations = Locations()
+        hot = [locations.fresh() for _ in range(HOT_LOCATIONS)]
+        asyncio.run(run_load(base_url, [(location, False) for location in hot], 1))
+
+        rnd = random.Random(args.seed)
+        print(f"{args.requests} requests per ratio, concurrency {args.concurrency}, {args.workers} worker(s)")
+        for ratio in ratios:
+            requests = []
+            for _ in range(args.requests):
+                is_hit = rnd.random() < ratio
+                requests.append((rnd.choice(hot) if is_hit else locations.fresh(), is_hit))
+
+            latencies, errors, elapsed = asyncio.run(run_load(base_url, requests, args.concurrency))
+            samples = latencies[True] + latencies[False]
+            throughput = len(samples) / elapsed
+            print(
+                f"hit ratio {ratio:4.2f}  throughput={throughput:8.1f} req/s  "
+                f"p50={percentile(samples, 50):8.2f}ms p95={percentile(samples, 95):8.2f}ms "
+                f"p99={percentile(samples, 99):8.2f}ms errors={errors}"
+            )
+            results.add(
+                f"hit ratio {ratio:.2f}", samples,
+                throughput_rps=round(throughput, 1),
+                errors=errors,
+                hits=summarize(latencies[True]),
+                misses=summarize(latencies[False])
+            )
+
+        hit_alloc, miss_alloc = measure_allocations(env, hot, locations)
+        print(f"allocation per request: hit={hit_alloc:.1f}KiB miss={miss_alloc:.1f}KiB")
+        for ratio in ratios:
+            results.data['results'][f"hit ratio {ratio:.2f}"]['alloc_kib'] = round(
+                ratio * hit_alloc + (1 - ratio) * miss_alloc, 1
+            )
+        results.add("allocation", hit_alloc_kib=hit_alloc, miss_alloc_kib=miss_alloc)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+    results.write(args.json)
+
+
+if __name__ == "__main__":
+    main()
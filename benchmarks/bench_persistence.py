@@ -0,0 +1,62 @@
+"""Save latency and statement counts for each persistence mode.
+
+    python benchmarks/bench_persistence.py [--iterations N] [--json results.json]
+
+Uses BENCH_DATABASE_URL (default: in-memory SQLite). Covers snapshot saves
+(row-per-hour and compact), an upsert that inserts a new location, and an
+upsert of an unchanged forecast, which should write almost nothing.
+"""
+import argparse
+import itertools
+import os
+
+from common import Results, allocations_per_call, report, time_calls
+from payloads import make_timeline
+
+from flask import Flask
+from extensions import db
+from service.bulk_writer import BulkWeatherWriter
+from service.upsert_writer import UpsertWeatherWriter
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("BENCH_DATABASE_URL", "sqlite://")
+    db.init_app(app)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    payload = make_timeline()
+    app = make_app()
+    results = Results("persistence", {'iterations': args.iterations})
+    locations = (f"bench:{i}" for i in itertools.count())
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        results.data['params']['database'] = db.engine.dialect.name
+        runs = [
+            ("snapshot rows", BulkWeatherWriter(db.session, hourly_storage="rows"), lambda: None),
+            ("snapshot compact", BulkWeatherWriter(db.session, hourly_storage="compact"), lambda: None),
+            ("upsert new location", UpsertWeatherWriter(db.session, hourly_storage="rows"), lambda: next(locations)),
+            ("upsert unchanged", UpsertWeatherWriter(db.session, hourly_storage="rows"), lambda: "bench:unchanged"),
+        ]
+        for name, writer, location in runs:
+            save = lambda: writer.save(payload, location())
+            samples = time_calls(save, args.iterations, warmup=2)
+            alloc = allocations_per_call(save, iterations=5)
+            stats = writer.last_stats.to_dict()
+            report(name, samples)
+            print(f"{'':<32} alloc={alloc:10.1f}KiB rows={stats['rows']} unchanged={stats['unchanged']} statements={stats['statements']}")
+            results.add(name, samples, alloc_kib=alloc, rows=stats['rows'], statements=stats['statements'])
+    results.write(args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Queries and latency for reading a stored forecast: lazy relationships vs WeatherRepository.
+
+    python benchmarks/bench_read_path.py [--iterations N]
+
+Uses BENCH_DATABASE_URL (default: in-memory SQLite). Exits non-zero if
+WeatherRepository.get_tree issues more than TREE_QUERIES statements, so it
+can guard against N+1 regressions in CI.
+"""
+import argparse
+import os
+import sys
+
+from common import report, time_calls
+from payloads import make_timeline
+
+from flask import Flask
+from extensions import db
+from models.weather import Weather
+from service.bulk_writer import BulkWeatherWriter
+from service.statement_counter import count_statements
+from service.weather_repository import WeatherRepository
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("BENCH_DATABASE_URL", "sqlite://")
+    db.init_app(app)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        db.create_all()
+        weather_row, _, _ = BulkWeatherWriter(db.session).save(make_timeline())
+        weather_id = weather_row['id']
+
+        def lazy_read():
+            db.session.expunge_all()
+            return db.session.get(Weather, weather_id).to_dict()
+
+        def repository_read():
+            db.session.expunge_all()
+            return WeatherRepository(db.session).get_tree(weather_id).to_dict()
+
+        for name, read in (("lazy relationships", lazy_read), ("WeatherRepository", repository_read)):
+            db.session.expunge_all()
+            with count_statements(db.engine) as counter:
+                read()
+            print(f"{name:<32} queries={counter.statements}")
+            report(name, time_calls(read, args.iterations))
+            if name == "WeatherRepository" and counter.statements > WeatherRepository.TREE_QUERIES:
+                print(f"FAIL: expected at most {WeatherRepository.TREE_QUERIES} queries")
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
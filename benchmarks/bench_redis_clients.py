@@ -0,0 +1,64 @@
+"""Redis GET under concurrent load: sync client via asyncio.to_thread vs the async client.
+
+    REDIS_URL=redis://localhost:6379/0 python benchmarks/bench_redis_clients.py [--concurrency N] [--requests N]
+"""
+import argparse
+import asyncio
+import time
+
+from common import report
+from payloads import make_timeline
+
+from extensions import get_async_redis_client, get_redis_client
+from service.bulk_writer import build_rows, weather_from_rows
+from service.weather_service import encode_body
+
+KEY = "bench:redis-clients"
+
+
+async def drive(get, concurrency, total):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                await get()
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    body = encode_body(weather_from_rows(*build_rows(make_timeline())).to_dict())
+    sync_client = get_redis_client(decode_responses=False)
+    async_client = get_async_redis_client()
+    sync_client.set(KEY, body)
+
+    runs = [
+        ("to_thread + sync client", lambda: asyncio.to_thread(sync_client.get, KEY)),
+        ("redis.asyncio client", lambda: async_client.get(KEY)),
+    ]
+    print(f"value {len(body)} bytes, concurrency {args.concurrency}, requests {args.requests}")
+    for name, get in runs:
+        latencies, errors, elapsed = asyncio.run(drive(get, args.concurrency, args.requests))
+        report(name, latencies)
+        print(f"{'':<32} throughput={len(latencies) / elapsed:9.1f} req/s errors={errors}")
+
+    sync_client.delete(KEY)
+
+
+if __name__ == "__main__":
+    main()
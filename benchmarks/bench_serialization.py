@@ -0,0 +1,74 @@
+"""Per-call cost of the steps between an upstream payload and a response body.
+
+    python benchmarks/bench_serialization.py [--iterations N] [--json results.json]
+
+Reports latency percentiles and the peak memory each step allocates.
+"""
+import argparse
+import json
+
+from common import Results, allocations_per_call, report, time_calls
+from payloads import make_timeline
+
+from models.hourly_codec import decode_hours, encode_hours
+from models.serialization import JSON_BACKEND, parse_fields, weather_dict_from_rows
+from routes.weather_routes import success_envelope
+from service.bulk_writer import build_rows, weather_from_rows
+from service.cache_codec import CacheCodec, zstd_available
+from service.upsert_writer import natural_rows
+from service.weather_service import encode_body, project_body
+from service.write_behind import decode_rows, encode_rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    payload = make_timeline()
+    raw = json.dumps(payload).encode("utf-8")
+    rows = build_rows(payload)
+    weather = weather_from_rows(*rows)
+    result = weather.to_dict()
+    body = encode_body(result)
+    fields = parse_fields("temp,humidity,icon")
+    hour_rows = [row for row in rows[1] if row['parent_id']][:24]
+    block = encode_hours(hour_rows)
+    queued = encode_rows(rows)
+    codecs = [CacheCodec("zlib")] + ([CacheCodec("zstd")] if zstd_available() else [])
+
+    steps = [
+        ("json.loads upstream payload", lambda: json.loads(raw)),
+        ("build_rows", lambda: build_rows(payload)),
+        ("natural_rows (upsert ids)", lambda: natural_rows(*build_rows(payload))),
+        ("weather_from_rows", lambda: weather_from_rows(*rows)),
+        ("Weather.to_dict", lambda: weather.to_dict()),
+        ("weather_dict_from_rows", lambda: weather_dict_from_rows(*rows)),
+        (f"encode_body ({JSON_BACKEND})", lambda: encode_body(result)),
+        ("project_body (3 fields)", lambda: project_body(body, fields)),
+        ("success_envelope", lambda: success_envelope(body)),
+        ("encode_hours (one day)", lambda: encode_hours(hour_rows)),
+        ("decode_hours (one day)", lambda: list(decode_hours(block))),
+        ("encode_rows (write-behind)", lambda: encode_rows(rows)),
+        ("decode_rows (write-behind)", lambda: decode_rows(queued)),
+    ]
+    for codec in codecs:
+        stored = codec.encode(body)
+        print(f"cache entry ({codec.algorithm} level {codec.level}): {len(body)} -> {len(stored)} bytes")
+        steps.append((f"cache encode ({codec.algorithm})", lambda codec=codec: codec.encode(body)))
+        steps.append((f"cache decode ({codec.algorithm})", lambda codec=codec, stored=stored: codec.decode(stored)))
+
+    results = Results("serialization", {'iterations': args.iterations, 'json_backend': JSON_BACKEND})
+    print(f"payload {len(raw)} bytes, body {len(body)} bytes, queued rows {len(queued)} bytes")
+    for name, fn in steps:
+        samples = time_calls(fn, args.iterations)
+        alloc = allocations_per_call(fn)
+        report(name, samples)
+        print(f"{'':<32} alloc={alloc:10.1f}KiB")
+        results.add(name, samples, alloc_kib=alloc)
+    results.write(args.json)
+
+
+if __name__ == "__main__":
+    main()
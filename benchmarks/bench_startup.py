@@ -0,0 +1,116 @@
+"""Cold-start cost of a worker: importing the app, building it, and the first readiness probe.
+
+    python benchmarks/bench_startup.py [--runs N] [--redis-url URL] [--database-url URL] [--json results.json]
+
+Every run is a fresh interpreter, as a new hypercorn worker is. Each one
+times `import app`, `create_app()`, the first GET /ready (which builds the
+database and Redis pools and opens their first connections) and a second,
+warm GET /ready. The process phase is the whole run, interpreter start-up
+included, measured from outside.
+
+Redis is fakeredis inside each run unless --redis-url is given, and the
+database is a temporary SQLite file unless --database-url is given. The
+schema is created once beforehand with `flask init-db`, which is timed too.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import Results, report
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+PHASES = ("import", "create_app", "first_ready", "warm_ready")
+
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+def child():
+    """One cold start; prints the phase timings as JSON"""
+    if os.getenv("BENCH_FAKE_REDIS") == "1":
+        from common import use_fake_redis
+        use_fake_redis()
+
+    timings = {}
+    started = time.perf_counter()
+    import app as app_module
+    timings['import'] = _elapsed_ms(started)
+
+    started = time.perf_counter()
+    app = app_module.create_app({"RATELIMIT_ENABLED": False})
+    timings['create_app'] = _elapsed_ms(started)
+
+    client = app.test_client()
+    for phase in ("first_ready", "warm_ready"):
+        started = time.perf_counter()
+        response = client.get("/ready")
+        timings[phase] = _elapsed_ms(started)
+        if response.status_code != 200:
+            raise SystemExit(f"/ready answered {response.status_code}: {response.get_data(as_text=True)}")
+    print(json.dumps(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--redis-url", help="use this Redis instead of fakeredis")
+    parser.add_argument("--database-url", help="use this database instead of a temporary SQLite file")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    workdir = tempfile.mkdtemp(prefix="weather-startup-")
+    env = {
+        **os.environ,
+        "REDIS_URL": args.redis_url or "redis://fakeredis",
+        "BENCH_FAKE_REDIS": "0" if args.redis_url else "1",
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "WEATHER_API_URL": os.getenv("WEATHER_API_URL", "http://127.0.0.1:9"),
+        "WEATHER_API_KEY": os.getenv("WEATHER_API_KEY", "bench"),
+        "API_VERSION": os.getenv("API_VERSION", "/api/v1"),
+    }
+    results = Results("startup", {
+        'runs': args.runs,
+        'redis': "redis" if args.redis_url else "fakeredis",
+        'database': env["DATABASE_URL"].split(":")[0]
+    })
+
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "app", "init-db"],
+        cwd=REPO_DIR, env=env, check=True, stdout=subprocess.DEVNULL
+    )
+    init_db_ms = _elapsed_ms(started)
+    print(f"{'init-db (once per deploy)':<32} {init_db_ms:8.1f}ms")
+    results.add("init_db", [init_db_ms])
+
+    samples = {phase: [] for phase in PHASES + ("process",)}
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child"],
+            cwd=REPO_DIR, env=env, check=True, capture_output=True, text=True
+        )
+        samples['process'].append(_elapsed_ms(started))
+        timings = json.loads(completed.stdout.strip().splitlines()[-1])
+        for phase in PHASES:
+            samples[phase].append(timings[phase])
+
+    for phase, phase_samples in samples.items():
+        report(phase, phase_samples)
+        results.add(phase, phase_samples)
+    results.write(args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Timing helpers shared by the benchmark scripts"""
+import os
+import sys
+import time
+
+# Benchmarks are run as scripts from the repo root: python benchmarks/<name>.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import load_config  # noqa: E402
+
+load_config()
+
+
+def use_fake_redis():
+    """Point every Redis client in this process at one in-memory fakeredis server"""
+    import fakeredis
+    import fakeredis.aioredis
+    import redis
+    import redis.asyncio
+
+    fake_server = fakeredis.FakeServer()
+    redis.ConnectionPool.from_url = classmethod(
+        lambda cls, url, **kwargs: fakeredis.FakeRedis(
+            server=fake_server, decode_responses=kwargs.get("decode_responses", False)
+        ).connection_pool
+    )
+    redis.asyncio.BlockingConnectionPool.from_url = classmethod(
+        lambda cls, url, **kwargs: fakeredis.aioredis.FakeRedis(server=fake_server).connection_pool
+    )
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_calls(fn, iterations, warmup=10):
+    """Call fn repeatedly and return per-call latencies in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(name, samples):
+    print(
+        f"{name:<32} n={len(samples):<6} "
+        f"p50={percentile(samples, 50):8.3f}ms "
+        f"p95={percentile(samples, 95):8.3f}ms "
+        f"p99={percentile(samples, 99):8.3f}ms"
+    )
+
+
+def summarize(samples):
+    return {
+        'n': len(samples),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3)
+    }
+
+
+def allocations_per_call(fn, iterations=20):
+    """Median peak memory (KiB) fn allocates on top of what is already live, traced with tracemalloc"""
+    import tracemalloc
+
+    fn()
+    tracemalloc.start()
+    try:
+        peaks = []
+        for _ in range(iterations):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+    finally:
+        tracemalloc.stop()
+    return round(percentile(peaks, 50), 1)
+
+
+def git_commit():
+    import subprocess
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Results:
+    """Collects one run's measurements and writes them as JSON for compare.py"""
+
+    def __init__(self, bench, params=None):
+        self.data = {
+            'bench': bench,
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'params': params or {},
+            'results': {}
+        }
+
+    def add(self, name, samples=None, **metrics):
+        entry = summarize(samples) if samples is not None else {}
+        entry.update(metrics)
+        self.data['results'][name] = entry
+        return entry
+
+    def write(self, path):
+        import json
+
+        if not path:
+            return
+        with open(path, "w") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        print(f"results written to {path}")
@@ -0,0 +1,47 @@
+"""Compare two result files written with --json, e.g. from two commits.
+
+    python benchmarks/compare.py base.json new.json
+
+Prints every numeric metric both runs share with its relative change.
+For latency and allocation lower is better; for throughput higher is.
+"""
+import argparse
+import json
+
+
+def flatten(entry, prefix=""):
+    for key, value in entry.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("new")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    if base['bench'] != new['bench']:
+        parser.error(f"cannot compare {base['bench']} results with {new['bench']} results")
+    if base['params'] != new['params']:
+        print(f"warning: parameters differ: {base['params']} vs {new['params']}")
+
+    print(f"{base['bench']}: {base['commit']} -> {new['commit']}")
+    for name, new_entry in new['results'].items():
+        base_metrics = dict(flatten(base['results'].get(name, {})))
+        for metric, value in flatten(new_entry):
+            if metric not in base_metrics or metric.rsplit(".", 1)[-1] == "n":
+                continue
+            before = base_metrics[metric]
+            change = f"{(value - before) / before * 100:+7.1f}%" if before else "    n/a"
+            print(f"{name:<32} {metric:<20} {before:>12} -> {value:<12} {change}")
+
+
+if __name__ == "__main__":
+    main()
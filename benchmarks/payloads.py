@@ -0,0 +1,103 @@
+"""Synthetic Visual Crossing timeline payloads for benchmarks.
+
+The shape follows the /timeline response: currentConditions, one block per
+day with 24 hourly blocks each, and a stations map.
+"""
+import random
+import time
+
+CONDITIONS = ["Clear", "Overcast", "Partially cloudy", "Rain, Partially cloudy"]
+ICONS = ["clear-day", "clear-night", "cloudy", "partly-cloudy-day", "partly-cloudy-night", "rain"]
+
+
+def _condition(rnd, epoch, label):
+    return {
+        "datetime": label,
+        "datetimeEpoch": epoch,
+        "temp": round(rnd.uniform(50, 95), 1),
+        "feelslike": round(rnd.uniform(50, 100), 1),
+        "humidity": round(rnd.uniform(10, 95), 2),
+        "dew": round(rnd.uniform(30, 70), 1),
+        "precip": round(rnd.choice([0.0, 0.0, 0.0, rnd.uniform(0, 0.4)]), 3),
+        "precipprob": rnd.choice([0.0, 0.0, 10.0, 35.0]),
+        "snow": 0.0,
+        "snowdepth": 0.0,
+        "preciptype": rnd.choice([None, None, ["rain"]]),
+        "windgust": round(rnd.uniform(0, 25), 1),
+        "windspeed": round(rnd.uniform(0, 15), 1),
+        "winddir": round(rnd.uniform(0, 360), 1),
+        "pressure": round(rnd.uniform(1000, 1020), 1),
+        "visibility": round(rnd.uniform(1, 15), 1),
+        "cloudcover": round(rnd.uniform(0, 100), 1),
+        "solarradiation": round(rnd.uniform(0, 800), 1),
+        "solarenergy": round(rnd.uniform(0, 3), 1),
+        "uvindex": rnd.randint(0, 10),
+        "severerisk": 10.0,
+        "conditions": rnd.choice(CONDITIONS),
+        "icon": rnd.choice(ICONS),
+        "stations": ["VIDP", "remote"],
+        "source": rnd.choice(["obs", "fcst", "comb"]),
+    }
+
+
+def make_timeline(lat=28.6139, long=77.209, days=15, seed=1):
+    """Build a timeline payload with `days` days of 24 hours each"""
+    rnd = random.Random(seed)
+    base = int(time.time()) // 86400 * 86400
+
+    day_blocks = []
+    for i in range(days):
+        epoch = base + i * 86400
+        day = _condition(rnd, epoch, time.strftime("%Y-%m-%d", time.gmtime(epoch)))
+        day.update({
+            "tempmax": round(rnd.uniform(80, 100), 1),
+            "tempmin": round(rnd.uniform(55, 75), 1),
+            "feelslikemax": round(rnd.uniform(80, 105), 1),
+            "feelslikemin": round(rnd.uniform(55, 75), 1),
+            "precipcover": 0.0,
+            "sunrise": "06:45:00",
+            "sunriseEpoch": epoch + 24300,
+            "sunset": "17:30:00",
+            "sunsetEpoch": epoch + 63000,
+            "moonphase": round(rnd.uniform(0, 1), 2),
+            "description": "Partly cloudy throughout the day.",
+        })
+        day["hours"] = [
+            _condition(rnd, epoch + hour * 3600, f"{hour:02d}:00:00") for hour in range(24)
+        ]
+        day_blocks.append(day)
+
+    current = _condition(rnd, base + 10 * 3600, "10:00:00")
+    current.update({
+        "sunrise": "06:45:00",
+        "sunriseEpoch": base + 24300,
+        "sunset": "17:30:00",
+        "sunsetEpoch": base + 63000,
+        "moonphase": 0.5,
+    })
+
+    return {
+        "queryCost": 1,
+        "latitude": lat,
+        "longitude": long,
+        "resolvedAddress": f"{lat},{long}",
+        "address": f"{lat},{long}",
+        "timezone": "Asia/Kolkata",
+        "tzoffset": 5.5,
+        "description": "Similar temperatures continuing with no rain expected.",
+        "alerts": [],
+        "days": day_blocks,
+        "stations": {
+            "VIDP": {
+                "distance": 12345.0,
+                "latitude": 28.57,
+                "longitude": 77.1,
+                "useCount": 0,
+                "id": "VIDP",
+                "name": "VIDP",
+                "quality": 50,
+                "contribution": 0.0,
+            }
+        },
+        "currentConditions": current,
+    }
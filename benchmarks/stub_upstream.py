@@ -0,0 +1,76 @@
+"""Local stand-in for the Visual Crossing timeline endpoint.
+
+    python benchmarks/stub_upstream.py [--port 8765] [--latency-ms 0]
+
+Serves GET /rest/services/timeline/{lat},{long} with a 15-day payload from
+payloads.make_timeline, so WEATHER_API_URL=http://127.0.0.1:8765 points the
+app at it. --latency-ms adds a fixed delay per response to stand in for the
+real API's round trip.
+"""
+import argparse
+import asyncio
+import json
+from functools import lru_cache
+from urllib.parse import unquote
+
+import common  # noqa: F401  (puts the repo on sys.path)
+from payloads import make_timeline
+
+TIMELINE_PREFIX = "/rest/services/timeline/"
+
+
+@lru_cache(maxsize=1024)
+def timeline_body(lat, long):
+    return json.dumps(make_timeline(lat=lat, long=long)).encode("utf-8")
+
+
+def make_app(latency_ms=0.0):
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        path = unquote(scope["path"])
+        status, body = 404, b'{"error":"not found"}'
+        if path.startswith(TIMELINE_PREFIX):
+            try:
+                lat, long = (float(part) for part in path[len(TIMELINE_PREFIX):].split(","))
+            except ValueError:
+                status, body = 400, b'{"error":"bad location"}'
+            else:
+                status, body = 200, timeline_body(lat, long)
+
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    return app
+
+
+def main():
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{args.port}"]
+    config.accesslog = None
+    asyncio.run(serve(make_app(args.latency_ms), config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Process configuration.
+
+.env is read into the environment once, by load_config(). The app factory
+calls it before importing the modules that read their settings at import
+time; scripts that import those modules directly call it first as well.
+"""
+from dotenv import load_dotenv
+import os
+
+# Settings without which requests cannot be served
+REQUIRED_SETTINGS = ("DATABASE_URL", "REDIS_URL", "WEATHER_API_URL", "WEATHER_API_KEY")
+
+_loaded = False
+
+
+def load_config() -> dict:
+    """Load .env once per process and return the Flask settings"""
+    global _loaded
+    if not _loaded:
+        load_dotenv()
+        _loaded = True
+    return {
+        "PROPAGATE_EXCEPTIONS": True,
+        "API_TITLE": "Weather REST API",
+        "API_VERSION": "v1",
+        "OPENAPI_VERSION": "3.0.3",
+        "OPENAPI_URL_PREFIX": "/",
+        "OPENAPI_SWAGGER_UI_PATH": "/swagger-ui",
+        "OPENAPI_SWAGGER_UI_URL": "https://cdn.jsdelivr.net/npm/swagger-ui-dist/",
+        "SQLALCHEMY_DATABASE_URI": os.getenv("DATABASE_URL"),
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        "JWT_SECRET_KEY": os.getenv("JWT_SECRET")
+    }
+
+
+def missing_settings() -> list:
+    """Names of the required settings that are not set"""
+    return [name for name in REQUIRED_SETTINGS if not os.getenv(name)]
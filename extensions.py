@@ -2,11 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 import redis
-from dotenv import load_dotenv
+import redis.asyncio
 import os
 
-load_dotenv()
-
 db = SQLAlchemy()
 limiter = Limiter(
     key_func=get_remote_address,
@@ -14,15 +12,46 @@ limiter = Limiter(
     storage_uri="redis://"
 )
 
-# Synchronous Redis connection pool (thread-safe)
-_redis_pool = None
+# Synchronous Redis connection pools (thread-safe), one per response decoding mode
+_redis_pools = {}
+
+def get_redis_client(decode_responses=True):
+    """Get a synchronous Redis client from the connection pool.
+
+    Pass decode_responses=False to get raw bytes back, e.g. for cached
+    response bodies that are served without being decoded.
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        raise ValueError("Redis url not found....")
+    pool = _redis_pools.get(decode_responses)
+    if pool is None:
+        pool = redis.ConnectionPool.from_url(redis_url, decode_responses=decode_responses, max_connections=10)
+        _redis_pools[decode_responses] = pool
+    return redis.Redis(connection_pool=pool)
+
+
+# Async Redis client shared by every request in the worker
+_async_redis_client = None
+
+def get_async_redis_client():
+    """Get the process-wide asyncio Redis client (bytes responses).
+
+    The pool blocks for up to REDIS_POOL_TIMEOUT seconds when all
+    REDIS_MAX_CONNECTIONS connections are busy instead of failing the command.
+    """
+    global _async_redis_client
+    if _async_redis_client is None:
+        from service.async_redis import AsyncRedis
+        from service.background_loop import get_background_loop
 
-def get_redis_client():
-    """Get a synchronous Redis client from the connection pool"""
-    global _redis_pool
-    if _redis_pool is None:
         redis_url = os.getenv("REDIS_URL")
         if not redis_url:
             raise ValueError("Redis url not found....")
-        _redis_pool = redis.ConnectionPool.from_url(redis_url, decode_responses=True, max_connections=10)
-    return redis.Redis(connection_pool=_redis_pool)
\ No newline at end of file
+        pool = redis.asyncio.BlockingConnectionPool.from_url(
+            redis_url,
+            max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", "64")),
+            timeout=float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+        )
+        _async_redis_client = AsyncRedis(redis.asyncio.Redis(connection_pool=pool), get_background_loop())
+    return _async_redis_client
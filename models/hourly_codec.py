@@ -0,0 +1,165 @@
+"""Columnar encoding for a day's hourly conditions.
+
+A day's hours are packed into one binary record: one typed array per metric
+instead of one ~40-column row per hour. Low-cardinality strings
+(conditions, icon, source) are coded against the existing enums, with any
+value the enum does not know kept in a small per-record string table.
+
+Layout: version (uint8), hour count (uint16), header length (uint32), then
+zlib (level 1) over a JSON header holding the string tables followed by the
+arrays in FIELDS order, all little-endian. The arrays are mostly zeros,
+nulls and slowly changing values, so they compress to roughly a third.
+"""
+from models.weather import Conditions, Icon, Source
+from array import array
+from datetime import datetime, timedelta
+import json
+import math
+import struct
+import sys
+import uuid
+import zlib
+
+VERSION = 1
+PREFIX = struct.Struct("<BHI")
+NULL_INT = -2 ** 63
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+# (row column, to_dict key, kind[, enum])
+FIELDS = [
+    ('id', 'id', 'uuid'),
+    ('current_conditions_datetime', 'datetime', 'datetime'),
+    ('datetime_epoch', 'datetime_epoch', 'int'),
+    ('temp', 'temp', 'float'),
+    ('feelslike', 'feelslike', 'float'),
+    ('humidity', 'humidity', 'float'),
+    ('dew', 'dew', 'float'),
+    ('precip', 'precip', 'float'),
+    ('precipprob', 'precipprob', 'float'),
+    ('snow', 'snow', 'float'),
+    ('snowdepth', 'snowdepth', 'float'),
+    ('preciptype', 'preciptype', 'str'),
+    ('windgust', 'windgust', 'float'),
+    ('windspeed', 'windspeed', 'float'),
+    ('winddir', 'winddir', 'float'),
+    ('pressure', 'pressure', 'float'),
+    ('visibility', 'visibility', 'float'),
+    ('cloudcover', 'cloudcover', 'float'),
+    ('solarradiation', 'solarradiation', 'float'),
+    ('solarenergy', 'solarenergy', 'float'),
+    ('uvindex', 'uvindex', 'int'),
+    ('conditions', 'conditions', 'enum', Conditions),
+    ('icon', 'icon', 'enum', Icon),
+    ('stations', 'stations', 'json'),
+    ('source', 'source', 'enum', Source),
+    ('sunrise', 'sunrise', 'datetime'),
+    ('sunrise_epoch', 'sunrise_epoch', 'int'),
+    ('sunset', 'sunset', 'datetime'),
+    ('sunset_epoch', 'sunset_epoch', 'int'),
+    ('moonphase', 'moonphase', 'float'),
+    ('tempmax', 'tempmax', 'float'),
+    ('tempmin', 'tempmin', 'float'),
+    ('feelslikemax', 'feelslikemax', 'float'),
+    ('feelslikemin', 'feelslikemin', 'float'),
+    ('precipcover', 'precipcover', 'float'),
+    ('severerisk', 'severerisk', 'float'),
+    ('description', 'description', 'str'),
+]
+
+TYPECODES = {'float': 'd', 'int': 'q', 'datetime': 'q', 'enum': 'H', 'str': 'H', 'json': 'H'}
+ITEMSIZE = {kind: array(code).itemsize for kind, code in TYPECODES.items()}
+ITEMSIZE['uuid'] = 16
+
+
+def _base_table(field):
+    return [member.value for member in field[3]] if field[2] == 'enum' else []
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_hours(hour_rows) -> bytes:
+    """Pack current_conditions row dicts (see bulk_writer.condition_row) for one day"""
+    count = len(hour_rows)
+    tables = {}
+    chunks = []
+
+    for field in FIELDS:
+        column, _, kind = field[0], field[1], field[2]
+        values = [row.get(column) for row in hour_rows]
+
+        if kind == 'uuid':
+            chunks.append(b"".join(uuid.UUID(value).bytes for value in values))
+        elif kind == 'float':
+            chunks.append(_to_little_endian(array('d', [math.nan if v is None else float(v) for v in values])))
+        elif kind == 'int':
+            chunks.append(_to_little_endian(array('q', [NULL_INT if v is None else int(v) for v in values])))
+        elif kind == 'datetime':
+            chunks.append(_to_little_endian(array('q', [
+                NULL_INT if v is None else (v - EPOCH) // ONE_MICROSECOND for v in values
+            ])))
+        else:
+            table = _base_table(field)
+            base_size = len(table)
+            index = {value: position for position, value in enumerate(table)}
+            codes = array('H')
+            for value in values:
+                if value is None:
+                    codes.append(0)
+                    continue
+                key = json.dumps(value, separators=(",", ":")) if kind == 'json' else value
+                if key not in index:
+                    index[key] = len(table)
+                    table.append(key)
+                codes.append(index[key] + 1)
+            if len(table) > base_size:
+                tables[column] = table[base_size:]
+            chunks.append(_to_little_endian(codes))
+
+    header = json.dumps({'t': tables}, separators=(",", ":")).encode("utf-8")
+    return PREFIX.pack(VERSION, count, len(header)) + zlib.compress(header + b"".join(chunks), 1)
+
+
+def decode_hours(blob: bytes):
+    """Yield the same dicts CurrentConditions.to_dict() produces for stored hour rows"""
+    version, count, header_length = PREFIX.unpack_from(blob)
+    if version != VERSION:
+        raise ValueError(f"Unsupported hourly block version: {version}")
+    blob = zlib.decompress(blob[PREFIX.size:])
+    tables = json.loads(blob[:header_length])['t']
+    offset = header_length
+
+    columns = []
+    for field in FIELDS:
+        column, key, kind = field[0], field[1], field[2]
+        size = ITEMSIZE[kind] * count
+        chunk = blob[offset:offset + size]
+        offset += size
+
+        if kind == 'uuid':
+            values = [str(uuid.UUID(bytes=chunk[i * 16:(i + 1) * 16])) for i in range(count)]
+        else:
+            raw = array(TYPECODES[kind])
+            raw.frombytes(chunk)
+            if sys.byteorder == 'big':
+                raw.byteswap()
+            if kind == 'float':
+                values = [None if math.isnan(v) else v for v in raw]
+            elif kind == 'int':
+                values = [None if v == NULL_INT else v for v in raw]
+            elif kind == 'datetime':
+                values = [None if v == NULL_INT else (EPOCH + timedelta(microseconds=v)).isoformat() for v in raw]
+            else:
+                table = _base_table(field) + tables.get(column, [])
+                if kind == 'json':
+                    table = [json.loads(value) for value in table]
+                values = [None if code == 0 else table[code - 1] for code in raw]
+        columns.append((key, values))
+
+    for i in range(count):
+        yield {key: values[i] for key, values in columns}
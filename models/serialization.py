@@ -0,0 +1,255 @@
+"""Field plans and the JSON backend behind every forecast response.
+
+A FieldPlan is compiled once per model: its column -> key mapping is turned
+into a single C-level attrgetter/itemgetter, so building a record's dict is
+one getter call and a zip instead of ~40 attribute reads and isoformat()
+calls in Python. Plans read ORM objects and the row dicts bulk_writer
+builds alike, so a freshly fetched forecast is serialized straight from its
+rows without constructing a Weather tree first.
+
+Datetimes are left for the JSON backend to format: orjson and msgspec
+encode them natively in C, and the stdlib fallback formats them through
+its `default` hook. All three produce the same isoformat() strings and
+write non-ASCII text as raw UTF-8. Floats below 1e-4 or from 1e16 up are
+written in different (equally valid) notations by each backend, so bodies
+are only byte-identical between workers running the same backend.
+"""
+from datetime import datetime
+from operator import attrgetter, itemgetter
+import json
+import os
+
+JSON_BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _load_backend(name: str):
+    """(name, dumps, loads) for a backend; dumps sorts keys and returns compact bytes"""
+    if name == "orjson":
+        import orjson
+
+        def dumps(value) -> bytes:
+            return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+
+        return name, dumps, orjson.loads
+
+    if name == "msgspec":
+        import msgspec
+
+        encoder = msgspec.json.Encoder(order="sorted")
+        return name, encoder.encode, msgspec.json.decode
+
+    def default(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def dumps(value) -> bytes:
+        return json.dumps(
+            value, separators=(",", ":"), sort_keys=True, ensure_ascii=False, default=default
+        ).encode("utf-8")
+
+    return "json", dumps, json.loads
+
+
+def select_backend(preferred: str = "auto"):
+    """The preferred backend, or with "auto" the fastest one installed"""
+    if preferred not in ("auto",) + JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {preferred}")
+    for name in (JSON_BACKENDS if preferred == "auto" else (preferred,)):
+        try:
+            return _load_backend(name)
+        except ImportError:
+            if preferred != "auto":
+                raise
+    return _load_backend("json")
+
+
+JSON_BACKEND, dumps, loads = select_backend(os.getenv("WEATHER_JSON_BACKEND", "auto"))
+
+
+class FieldPlan:
+    """Precompiled (column, key) mapping for one model's serialized records"""
+
+    def __init__(self, fields, datetime_columns=()):
+        self.fields = tuple(fields)
+        self.columns = tuple(column for column, _ in self.fields)
+        self.keys = tuple(key for _, key in self.fields)
+        self.datetime_positions = tuple(
+            position for position, column in enumerate(self.columns) if column in datetime_columns
+        )
+        self._datetime_columns = frozenset(datetime_columns)
+        self._read_object = self._getter(attrgetter, self.columns)
+        self._read_row = self._getter(itemgetter, self.columns)
+        self._read_record = self._getter(itemgetter, self.keys)
+        self._projections = {}
+
+    @staticmethod
+    def _getter(factory, names):
+        # A getter over a single name returns the value itself rather than a 1-tuple
+        if len(names) == 1:
+            getter = factory(names[0])
+            return lambda source: (getter(source),)
+        return factory(*names)
+
+    def project(self, keys):
+        """Plan limited to `keys`, in plan order; compiled once per distinct key set"""
+        keys = frozenset(keys)
+        plan = self._projections.get(keys)
+        if plan is None:
+            unknown = keys.difference(self.keys)
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+            plan = FieldPlan(
+                [field for field in self.fields if field[1] in keys],
+                self._datetime_columns
+            )
+            self._projections[keys] = plan
+        return plan
+
+    def from_row(self, row: dict) -> dict:
+        """Record for a row dict keyed by column name (see bulk_writer.build_rows)"""
+        return dict(zip(self.keys, self._read_row(row)))
+
+    def pick(self, record: dict) -> dict:
+        """Narrow an already-serialized record (keyed by this plan's keys) to the plan's fields"""
+        return dict(zip(self.keys, self._read_record(record)))
+
+    def to_dict(self, obj) -> dict:
+        """JSON-ready record for an ORM object, with datetimes as isoformat() strings"""
+        values = self._read_object(obj)
+        if self.datetime_positions:
+            values = list(values)
+            for position in self.datetime_positions:
+                if values[position] is not None:
+                    values[position] = values[position].isoformat()
+        return dict(zip(self.keys, values))
+
+
+WEATHER_PLAN = FieldPlan([
+    ('id', 'id'),
+    ('query_cost', 'query_cost'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('resolved_address', 'resolved_address'),
+    ('address', 'address'),
+    ('timezone', 'timezone'),
+    ('tzoffset', 'tzoffset'),
+    ('description', 'description'),
+    ('alerts', 'alerts'),
+    ('location_key', 'location_key'),
+])
+
+CONDITIONS_PLAN = FieldPlan([
+    ('id', 'id'),
+    ('current_conditions_datetime', 'datetime'),
+    ('datetime_epoch', 'datetime_epoch'),
+    ('temp', 'temp'),
+    ('feelslike', 'feelslike'),
+    ('humidity', 'humidity'),
+    ('dew', 'dew'),
+    ('precip', 'precip'),
+    ('precipprob', 'precipprob'),
+    ('snow', 'snow'),
+    ('snowdepth', 'snowdepth'),
+    ('preciptype', 'preciptype'),
+    ('windgust', 'windgust'),
+    ('windspeed', 'windspeed'),
+    ('winddir', 'winddir'),
+    ('pressure', 'pressure'),
+    ('visibility', 'visibility'),
+    ('cloudcover', 'cloudcover'),
+    ('solarradiation', 'solarradiation'),
+    ('solarenergy', 'solarenergy'),
+    ('uvindex', 'uvindex'),
+    ('conditions', 'conditions'),
+    ('icon', 'icon'),
+    ('stations', 'stations'),
+    ('source', 'source'),
+    ('sunrise', 'sunrise'),
+    ('sunrise_epoch', 'sunrise_epoch'),
+    ('sunset', 'sunset'),
+    ('sunset_epoch', 'sunset_epoch'),
+    ('moonphase', 'moonphase'),
+    ('tempmax', 'tempmax'),
+    ('tempmin', 'tempmin'),
+    ('feelslikemax', 'feelslikemax'),
+    ('feelslikemin', 'feelslikemin'),
+    ('precipcover', 'precipcover'),
+    ('severerisk', 'severerisk'),
+    ('description', 'description'),
+], datetime_columns=('current_conditions_datetime', 'sunrise', 'sunset'))
+
+STATION_PLAN = FieldPlan([
+    ('id', 'id'),
+    ('distance', 'distance'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('use_count', 'use_count'),
+    ('station_id', 'station_id'),
+    ('name', 'name'),
+    ('quality', 'quality'),
+    ('contribution', 'contribution'),
+])
+
+
+def parse_fields(value):
+    """Condition fields requested with ?fields=a,b,c, or None for all of them"""
+    if not value:
+        return None
+    keys = [key.strip() for key in value.split(",") if key.strip()]
+    if not keys:
+        return None
+    # Raises ValueError for names the plan does not know
+    CONDITIONS_PLAN.project(keys)
+    return frozenset(keys)
+
+
+def weather_dict_from_rows(weather_row, condition_rows, station_rows, fields=None) -> dict:
+    """The Weather.to_dict() shape built directly from row dicts.
+
+    `fields` narrows the current, day and hour records to those keys.
+    """
+    conditions = CONDITIONS_PLAN if fields is None else CONDITIONS_PLAN.project(fields)
+    current_id = weather_row['current_conditions_id']
+
+    hours = {}
+    for row in condition_rows:
+        if row['parent_id']:
+            hours.setdefault(row['parent_id'], []).append(conditions.from_row(row))
+
+    current = None
+    days = []
+    for row in condition_rows:
+        if row['parent_id']:
+            continue
+        record = conditions.from_row(row)
+        if row['id'] == current_id:
+            current = record
+            continue
+        day_hours = hours.get(row['id'])
+        if day_hours:
+            record['hours'] = day_hours
+        days.append(record)
+
+    data = WEATHER_PLAN.from_row(weather_row)
+    data['current_conditions'] = current
+    data['days'] = days
+    data['stations'] = [STATION_PLAN.from_row(row) for row in station_rows]
+    return data
+
+
+def project_weather(data: dict, fields) -> dict:
+    """Narrow a serialized forecast's current, day and hour records to `fields`"""
+    conditions = CONDITIONS_PLAN.project(fields)
+    projected = dict(data)
+    if data.get('current_conditions'):
+        projected['current_conditions'] = conditions.pick(data['current_conditions'])
+
+    days = []
+    for day in data.get('days') or []:
+        record = conditions.pick(day)
+        if day.get('hours'):
+            record['hours'] = [conditions.pick(hour) for hour in day['hours']]
+        days.append(record)
+    projected['days'] = days
+    return projected
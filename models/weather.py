@@ -1,6 +1,7 @@
 from enum import Enum
 from datetime import datetime, timezone
 from extensions import db
+from models.serialization import CONDITIONS_PLAN, STATION_PLAN, WEATHER_PLAN
 import uuid
 
 class Conditions(Enum):
@@ -37,6 +38,12 @@ class ID(Enum):
 
 class CurrentConditions(db.Model):
     __tablename__ = 'current_conditions'
+    __table_args__ = (
+        # A forecast's rows by time (history ranges, ordered tree loads)
+        db.Index('ix_current_conditions_weather_epoch', 'weather_id', 'datetime_epoch'),
+        # A day's hours
+        db.Index('ix_current_conditions_parent_epoch', 'parent_id', 'datetime_epoch'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     current_conditions_datetime = db.Column(db.DateTime, nullable=False)
@@ -75,6 +82,8 @@ class CurrentConditions(db.Model):
     precipcover = db.Column(db.Float, nullable=True)  # Changed from Integer to Float
     severerisk = db.Column(db.Float, nullable=True)  # Changed from Integer to Float
     description = db.Column(db.String(255), nullable=True)
+    # Digest of the row's values, set in upsert mode so unchanged rows are skipped
+    row_hash = db.Column(db.String(32), nullable=True)
 
 
     # Foreign keys
@@ -83,6 +92,8 @@ class CurrentConditions(db.Model):
 
     # Relationships
     hours = db.relationship('CurrentConditions', backref=db.backref('parent', remote_side=[id]), lazy=True)
+    # Set instead of hour rows when hours are stored in compact mode
+    hourly_block = db.relationship('HourlyBlock', uselist=False, lazy=True)
 
     # Timestamps
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
@@ -90,52 +101,35 @@ class CurrentConditions(db.Model):
 
     def to_dict(self, include_hours=False):
         """Convert CurrentConditions to dictionary"""
-        data = {
-            'id': self.id,
-            'datetime': self.current_conditions_datetime.isoformat() if self.current_conditions_datetime else None,
-            'datetime_epoch': self.datetime_epoch,
-            'temp': self.temp,
-            'feelslike': self.feelslike,
-            'humidity': self.humidity,
-            'dew': self.dew,
-            'precip': self.precip,
-            'precipprob': self.precipprob,
-            'snow': self.snow,
-            'snowdepth': self.snowdepth,
-            'preciptype': self.preciptype,
-            'windgust': self.windgust,
-            'windspeed': self.windspeed,
-            'winddir': self.winddir,
-            'pressure': self.pressure,
-            'visibility': self.visibility,
-            'cloudcover': self.cloudcover,
-            'solarradiation': self.solarradiation,
-            'solarenergy': self.solarenergy,
-            'uvindex': self.uvindex,
-            'conditions': self.conditions,
-            'icon': self.icon,
-            'stations': self.stations,
-            'source': self.source,
-            'sunrise': self.sunrise.isoformat() if self.sunrise else None,
-            'sunrise_epoch': self.sunrise_epoch,
-            'sunset': self.sunset.isoformat() if self.sunset else None,
-            'sunset_epoch': self.sunset_epoch,
-            'moonphase': self.moonphase,
-            'tempmax': self.tempmax,
-            'tempmin': self.tempmin,
-            'feelslikemax': self.feelslikemax,
-            'feelslikemin': self.feelslikemin,
-            'precipcover': self.precipcover,
-            'severerisk': self.severerisk,
-            'description': self.description
-        }
-
-        if include_hours and self.hours:
-            data['hours'] = [hour.to_dict(include_hours=False) for hour in self.hours]
+        data = CONDITIONS_PLAN.to_dict(self)
+
+        if include_hours:
+            if self.hours:
+                data['hours'] = [hour.to_dict(include_hours=False) for hour in self.hours]
+            # Only days have hourly blocks; checking on an hour row would lazy-load one per hour
+            elif self.parent_id is None and self.hourly_block is not None:
+                data['hours'] = self.hourly_block.decode_hours()
 
         return data
 
 
+class HourlyBlock(db.Model):
+    """A day's hourly conditions packed into one columnar record (see models/hourly_codec.py)"""
+    __tablename__ = 'hourly_block'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    day_id = db.Column(db.String(36), db.ForeignKey('current_conditions.id'), nullable=False, unique=True)
+    weather_id = db.Column(db.String(36), db.ForeignKey('weather.id'), nullable=True, index=True)
+    hour_count = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def decode_hours(self):
+        """Decode to the same dicts CurrentConditions.to_dict() gives for hour rows"""
+        from models.hourly_codec import decode_hours
+        return list(decode_hours(self.data))
+
+
 class Station(db.Model):
     __tablename__ = 'station'
 
@@ -148,27 +142,24 @@ class Station(db.Model):
     name = db.Column(db.String(255), nullable=False)
     quality = db.Column(db.Integer, nullable=False)
     contribution = db.Column(db.Float, nullable=False)  # Changed from Integer to Float
-    weather_id = db.Column(db.String(36), db.ForeignKey('weather.id'), nullable=True)
+    weather_id = db.Column(db.String(36), db.ForeignKey('weather.id'), nullable=True, index=True)
+    row_hash = db.Column(db.String(32), nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
 
     def to_dict(self):
         """Convert Station to dictionary"""
-        return {
-            'id': self.id,
-            'distance': self.distance,
-            'latitude': self.latitude,
-            'longitude': self.longitude,
-            'use_count': self.use_count,
-            'station_id': self.station_id,
-            'name': self.name,
-            'quality': self.quality,
-            'contribution': self.contribution
-        }
+        return STATION_PLAN.to_dict(self)
 
 
 class Weather(db.Model):
     __tablename__ = 'weather'
+    __table_args__ = (
+        # Bounding-box searches for the nearest stored location
+        db.Index('ix_weather_lat_long', 'latitude', 'longitude'),
+        # Newest forecast for a location
+        db.Index('ix_weather_location_updated', 'location_key', 'updated_at'),
+    )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     query_cost = db.Column(db.Integer, nullable=False)
@@ -180,6 +171,10 @@ class Weather(db.Model):
     tzoffset = db.Column(db.Float, nullable=False)
     description = db.Column(db.Text, nullable=False)
     alerts = db.Column(db.JSON, nullable=True)
+    # Spatial cell the forecast was fetched for (see service/geo_keys.py)
+    location_key = db.Column(db.String(64), nullable=True, index=True)
+    # First day of the latest fetch; older days of an upserted tree are history, not forecast
+    first_day_epoch = db.Column(db.Integer, nullable=True)
     days = db.relationship('CurrentConditions', foreign_keys=[CurrentConditions.weather_id], backref='weather', lazy=True)
     stations = db.relationship('Station', backref='weather', lazy=True)
     current_conditions_id = db.Column(db.String(36), db.ForeignKey('current_conditions.id'), nullable=True)
@@ -187,26 +182,24 @@ class Weather(db.Model):
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
 
+    def in_forecast(self, day) -> bool:
+        """Whether a stored day belongs to the latest fetch rather than the history kept by upsert mode"""
+        return self.first_day_epoch is None or day.datetime_epoch >= self.first_day_epoch
+
+    def to_summary_dict(self):
+        """Weather's own columns, without current conditions, days or stations"""
+        return WEATHER_PLAN.to_dict(self)
+
     def to_dict(self):
         """Convert Weather to dictionary"""
         # Get days (excluding current conditions to avoid duplication)
         days_list = []
         for day in self.days:
-            if day.id != self.current_conditions_id:
+            if day.id != self.current_conditions_id and self.in_forecast(day):
                 days_list.append(day.to_dict(include_hours=True))
 
-        return {
-            'id': self.id,
-            'query_cost': self.query_cost,
-            'latitude': self.latitude,
-            'longitude': self.longitude,
-            'resolved_address': self.resolved_address,
-            'address': self.address,
-            'timezone': self.timezone,
-            'tzoffset': self.tzoffset,
-            'description': self.description,
-            'alerts': self.alerts,
-            'current_conditions': self.current_conditions.to_dict() if self.current_conditions else None,
-            'days': days_list,
-            'stations': [station.to_dict() for station in self.stations]
-        }
+        data = self.to_summary_dict()
+        data['current_conditions'] = self.current_conditions.to_dict() if self.current_conditions else None
+        data['days'] = days_list
+        data['stations'] = [station.to_dict() for station in self.stations]
+        return data
@@ -0,0 +1,75 @@
+from flask_smorest import Blueprint
+from extensions import db, get_async_redis_client, limiter
+from flask import jsonify
+from config import missing_settings
+from routes.metrics_routes import db_pool_stats
+from service.tiered_cache import get_weather_cache
+from service.upstream_client import get_upstream_client
+from sqlalchemy import text
+import asyncio
+import os
+import time
+
+health_blp = Blueprint("Health", __name__, description="liveness and readiness probes")
+
+# How long each readiness check may take before it counts as failed
+READY_TIMEOUT_SECONDS = float(os.getenv("WEATHER_READY_TIMEOUT_SECONDS", "2"))
+
+
+def _ping_db():
+    with db.engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+async def _check(name: str, probe, stats):
+    """Run one probe under the timeout; the pool stats are read afterwards, once it is warm"""
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(probe(), READY_TIMEOUT_SECONDS)
+    except Exception as e:
+        return name, {"ready": False, "error": str(e) or type(e).__name__}
+    return name, {
+        "ready": True,
+        "ms": round((time.perf_counter() - started) * 1000, 3),
+        "pool": stats()
+    }
+
+
+@health_blp.route("/live", methods = ["GET"])
+@limiter.exempt
+def get_live():
+    """Liveness: the worker is up and serving requests"""
+    return jsonify({"status" : True})
+
+
+@health_blp.route("/ready", methods = ["GET"])
+@limiter.exempt
+async def get_ready():
+    """Readiness: configuration is complete and the database and Redis pools answer.
+
+    Pools are built lazily, so the first probe is also what opens their
+    first connections. The upstream pool only warms with the first miss
+    and is reported without gating readiness.
+    """
+    missing = missing_settings()
+    if missing:
+        return jsonify({
+            "status" : False,
+            "error" : f"missing settings: {', '.join(missing)}"
+        }), 503
+
+    redis_client = get_async_redis_client()
+    checks = dict(await asyncio.gather(
+        _check("database", lambda: asyncio.to_thread(_ping_db), db_pool_stats),
+        _check("redis", redis_client.ping, redis_client.pool_stats)
+    ))
+    # Build the tiered cache ahead of the first request
+    get_weather_cache()
+    upstream = get_upstream_client().stats()
+    checks["upstream"] = {"ready": True, "warm": upstream['connections'] > 0, "pool": upstream}
+
+    ready = all(check["ready"] for check in checks.values())
+    return jsonify({
+        "status" : ready,
+        "checks" : checks
+    }), 200 if ready else 503
@@ -0,0 +1,188 @@
+from flask_smorest import Blueprint
+from extensions import db
+from flask import Response, current_app, jsonify, request
+from datetime import datetime, timezone
+from models.serialization import dumps, parse_fields
+from routes.weather_routes import success_envelope
+from service.history_repository import HistoryRepository
+from service.weather_service import WeatherService
+import math
+import os
+import time
+
+history_blp = Blueprint("History", __name__, description="stored weather history")
+api_version = os.getenv("API_VERSION")
+
+history_max_days = float(os.getenv("WEATHER_HISTORY_MAX_DAYS", "31"))
+nearest_max_radius_km = float(os.getenv("WEATHER_NEAREST_MAX_RADIUS_KM", "50"))
+
+
+class HistoryRequestError(Exception):
+    pass
+
+
+def _float_arg(name: str, required: bool = True):
+    value = request.args.get(name)
+    if value is None or value == "":
+        if required:
+            raise HistoryRequestError(f"{name} is missing")
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise HistoryRequestError(f"{name} must be a number")
+    # float() accepts "inf", "nan" and "1e400"
+    if not math.isfinite(number):
+        raise HistoryRequestError(f"{name} must be a finite number")
+    return number
+
+
+def _coordinates():
+    """(latitude, longitiude) from the query, range-checked"""
+    latitude = _float_arg("latitude")
+    longitiude = _float_arg("longitiude")
+    if not -90 <= latitude <= 90:
+        raise HistoryRequestError("latitude must be between -90 and 90")
+    if not -180 <= longitiude <= 180:
+        raise HistoryRequestError("longitiude must be between -180 and 180")
+    return latitude, longitiude
+
+
+def _epoch_arg(name: str, default: int) -> int:
+    """Epoch seconds from ?name=, given as epoch seconds or an ISO 8601 date/datetime (UTC unless offset)"""
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        pass
+    else:
+        if not math.isfinite(number):
+            raise HistoryRequestError(f"{name} must be a finite number")
+        return int(number)
+    try:
+        parsed = datetime.fromisoformat(value)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+    except (ValueError, OverflowError):
+        raise HistoryRequestError(f"{name} must be epoch seconds or an ISO 8601 date")
+
+
+def _time_range(default_days: float):
+    end = _epoch_arg("end", int(time.time()))
+    start = _epoch_arg("start", int(end - default_days * 86400))
+    if start > end:
+        raise HistoryRequestError("start must not be after end")
+    if end - start > history_max_days * 86400:
+        raise HistoryRequestError(f"at most {history_max_days:g} days per request")
+    return start, end
+
+
+def _radius_arg():
+    radius_km = _float_arg("radius_km", required=False)
+    if radius_km is not None and not 0 < radius_km <= nearest_max_radius_km:
+        raise HistoryRequestError(f"radius_km must be between 0 and {nearest_max_radius_km:g}")
+    return radius_km
+
+
+def _location_key(repository: HistoryRepository):
+    """Location key for ?latitude=&longitiude=: the point's own cell, or with ?radius_km= the nearest stored location"""
+    latitude, longitiude = _coordinates()
+    radius_km = _radius_arg()
+    if radius_km is None:
+        location_key, _, _ = WeatherService.key_scheme.cell(latitude, longitiude)
+        return location_key
+
+    nearest = repository.nearest_location(latitude, longitiude, radius_km)
+    if nearest is None:
+        raise HistoryRequestError(f"no stored location within {radius_km:g} km")
+    return nearest['location_key']
+
+
+def _error(message: str, status: int = 200):
+    return jsonify({
+        "status" : False,
+        "error" : message
+    }), status
+
+
+def _success(data: dict):
+    return Response(success_envelope(dumps(data)), status=200, mimetype="application/json")
+
+
+@history_blp.route(f"{api_version}/weather/history/hourly", methods = ["GET"])
+def get_hourly_history():
+    """Stored hourly records for a location over a time range (default: the last 24 hours).
+
+    Query: latitude, longitiude, optional start/end (epoch seconds or ISO 8601),
+    radius_km (use the nearest stored location) and fields (as on /weather).
+    """
+    try:
+        fields = parse_fields(request.args.get("fields"))
+        repository = HistoryRepository(db.session)
+        location_key = _location_key(repository)
+        start, end = _time_range(default_days=1)
+    except (HistoryRequestError, ValueError) as e:
+        return _error(str(e))
+
+    try:
+        hours = repository.hourly_series(location_key, start, end, fields=fields)
+    except Exception as e:
+        current_app.logger.exception("Hourly history request failed")
+        return _error(str(e), 400)
+
+    return _success({
+        'location_key': location_key,
+        'start': start,
+        'end': end,
+        'hours': hours
+    })
+
+
+@history_blp.route(f"{api_version}/weather/history/daily", methods = ["GET"])
+def get_daily_history():
+    """Per-day temperature min/max/avg and precipitation totals (default: the last 7 days).
+
+    Query: latitude, longitiude, optional start/end and radius_km as for the hourly series.
+    """
+    try:
+        repository = HistoryRepository(db.session)
+        location_key = _location_key(repository)
+        start, end = _time_range(default_days=7)
+    except HistoryRequestError as e:
+        return _error(str(e))
+
+    try:
+        days = repository.daily_aggregates(location_key, start, end)
+    except Exception as e:
+        current_app.logger.exception("Daily history request failed")
+        return _error(str(e), 400)
+
+    return _success({
+        'location_key': location_key,
+        'start': start,
+        'end': end,
+        'days': days
+    })
+
+
+@history_blp.route(f"{api_version}/weather/nearest", methods = ["GET"])
+def get_nearest_location():
+    """Closest stored location to a point. Query: latitude, longitiude, radius_km (default 5)"""
+    try:
+        latitude, longitiude = _coordinates()
+        radius_km = _radius_arg() or min(5.0, nearest_max_radius_km)
+    except HistoryRequestError as e:
+        return _error(str(e))
+
+    try:
+        nearest = HistoryRepository(db.session).nearest_location(latitude, longitiude, radius_km)
+    except Exception as e:
+        current_app.logger.exception("Nearest location request failed")
+        return _error(str(e), 400)
+
+    if nearest is None:
+        return _error(f"no stored location within {radius_km:g} km")
+    return _success(nearest)
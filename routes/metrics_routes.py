@@ -0,0 +1,70 @@
+from flask_smorest import Blueprint
+from extensions import db, get_async_redis_client, limiter
+from flask import Response, current_app, jsonify
+from service.metrics import metrics
+from service.tiered_cache import get_weather_cache
+from service.upstream_client import get_upstream_client
+from service.weather_service import WeatherService
+from service.write_behind import get_write_queue
+
+metrics_blp = Blueprint("Metrics", __name__, description="Prometheus metrics")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _stat_samples(stats: dict, **labels):
+    """One sample per numeric entry of a stats dict, labelled by its key"""
+    return [
+        ({**labels, 'stat': key}, value)
+        for key, value in stats.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    ]
+
+
+def db_pool_stats() -> dict:
+    # Only QueuePool-style pools report sizes; SQLite's pools do not
+    pool = db.engine.pool
+    stats = {}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if callable(method):
+            stats[name] = method()
+    return stats
+
+
+async def collect_gauges():
+    """Point-in-time state of the caches, pools and write queue in this worker"""
+    cache_stats = get_weather_cache().stats()
+    gauges = [
+        ("weather_l1_cache", "In-process cache counters and size", _stat_samples(cache_stats['l1'] or {})),
+        ("weather_l2_cache", "Redis cache counters", _stat_samples(cache_stats['l2'])),
+        ("weather_cache_codec", "Compression of Redis cache entries: bytes and milliseconds spent", _stat_samples(cache_stats['codec'])),
+        ("weather_single_flight", "Coalesced cache fills", _stat_samples(WeatherService.single_flight.stats)),
+        ("weather_refresh", "Background refresh counters", _stat_samples(WeatherService.refresher.stats)),
+        ("weather_upstream", "Upstream requests and connection pool", _stat_samples(get_upstream_client().stats())),
+        ("weather_redis_pool", "Async Redis connection pool", _stat_samples(get_async_redis_client().pool_stats())),
+        ("weather_db_pool", "Database connection pool", _stat_samples(db_pool_stats())),
+    ]
+
+    write_queue = get_write_queue()
+    if write_queue is not None:
+        try:
+            queue_stats = await write_queue.metrics()
+        except Exception:
+            current_app.logger.exception("Could not read write-behind queue metrics")
+        else:
+            gauges.append(("weather_write_queue", "Write-behind queue depth, lag and counters", _stat_samples(queue_stats)))
+    return gauges
+
+
+@metrics_blp.route("/metrics", methods = ["GET"])
+@limiter.exempt
+async def get_metrics():
+    """Prometheus exposition of stage latencies, cache, pool and queue metrics"""
+    if not metrics.enabled:
+        return jsonify({
+            "status" : False,
+            "error" : "metrics are disabled"
+        }), 404
+
+    return Response(metrics.render(await collect_gauges()), status=200, content_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,27 +1,29 @@
 from flask_smorest import Blueprint
 from extensions import limiter
-from flask import jsonify, request
-from dotenv import load_dotenv
+from flask import Response, current_app, jsonify, request, stream_with_context
 from service.weather_service import WeatherService
+from service.weather_stream import STREAM_MODES, stream_weather
+from models.serialization import parse_fields
+import json
 import os
 
-load_dotenv()
-
 weather_blp = Blueprint("Weather",  __name__, description="weather service")
 api_version = os.getenv("API_VERSION")
-redis_url = os.getenv("REDIS_URL")
-if not redis_url:
-    raise ValueError("Redis url not found....")
+
+batch_max_size = int(os.getenv("WEATHER_BATCH_MAX_SIZE", "500"))
+batch_rate_limit = os.getenv("WEATHER_BATCH_RATE_LIMIT", "600 per hour")
+
+
+def success_envelope(body: bytes) -> bytes:
+    """Wrap an already-encoded data body as {"data": ..., "status": true} without re-encoding it"""
+    return b'{"data":' + body + b',"status":true}\n'
 
 
 @weather_blp.route(f"{api_version}/weather", methods = ["POST"])
 async def get_weather_details():
-    print("=== REQUEST RECEIVED ===")
     data = request.get_json()
-    print(f"Data received: {data}")
     longitiude = float(data.get("longitiude"))
     latitude = float(data.get("latitude"))
-    print(f"Long: {longitiude}, Lat: {latitude}")
 
     if not longitiude:
         return jsonify({
@@ -35,23 +37,106 @@ async def get_weather_details():
             "error" : "latitude is missing"
         }), 200
 
+    # Opt-in streaming of the stored forecast: ?stream=ndjson or ?stream=json
+    stream_mode = request.args.get("stream")
+    if stream_mode and stream_mode not in STREAM_MODES:
+        return jsonify({
+            "status" : False,
+            "error" : f"stream must be one of {', '.join(STREAM_MODES)}"
+        }), 200
+
+    # Optional projection of the condition records: ?fields=temp,humidity,icon
+    try:
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({
+            "status" : False,
+            "error" : str(e)
+        }), 200
+
+    if fields and stream_mode:
+        return jsonify({
+            "status" : False,
+            "error" : "fields cannot be combined with stream"
+        }), 200
+
     try:
-        print("Creating weather service...")
         weather_service = await WeatherService.create()
-        print("Weather service created, fetching weather...")
-        weather = await weather_service.get_weather_details_from_api(
+        if stream_mode:
+            weather_id = await weather_service.get_stored_weather_id(long=longitiude, lat=latitude)
+            mimetype = "application/x-ndjson" if stream_mode == "ndjson" else "application/json"
+            return Response(stream_with_context(stream_weather(weather_id, stream_mode)), status=200, mimetype=mimetype)
+
+        body = await weather_service.get_weather_details_from_api(
             long=longitiude,
-            lat=latitude
+            lat=latitude,
+            fields=fields
         )
-        print("Weather fetched, converting to dict...")
-        result = weather.to_dict()
-        print("Returning response...")
-        return jsonify({"status": True, "data": result}), 200
+        return Response(success_envelope(body), status=200, mimetype="application/json")
     except Exception as e:
-        print(f"ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        current_app.logger.exception("Weather request failed")
         return jsonify({
             "status" : False,
             "error" : str(e)
-        }), 400
\ No newline at end of file
+        }), 400
+
+
+def _coordinate(item, field):
+    try:
+        return float(item.get(field))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+@weather_blp.route(f"{api_version}/weather/batch", methods = ["POST"])
+@limiter.limit(batch_rate_limit)
+async def get_weather_batch():
+    """Weather for many coordinates, streamed back as NDJSON in input order.
+
+    Body: {"locations": [{"latitude": .., "longitiude": ..}, ...]}
+    Accepts the same ?fields= projection as the single-location endpoint.
+    Each line is {"data": .., "index": i, "status": true} or
+    {"error": "..", "index": i, "status": false}.
+    """
+    data = request.get_json(silent=True) or {}
+    locations = data.get("locations")
+
+    if not isinstance(locations, list) or not locations:
+        return jsonify({
+            "status" : False,
+            "error" : "locations is missing"
+        }), 200
+
+    if len(locations) > batch_max_size:
+        return jsonify({
+            "status" : False,
+            "error" : f"at most {batch_max_size} locations per batch"
+        }), 200
+
+    try:
+        fields = parse_fields(request.args.get("fields"))
+    except ValueError as e:
+        return jsonify({
+            "status" : False,
+            "error" : str(e)
+        }), 200
+
+    coordinates = [(_coordinate(item, "latitude"), _coordinate(item, "longitiude")) for item in locations]
+
+    try:
+        weather_service = await WeatherService.create()
+        results = await weather_service.get_weather_batch(coordinates, fields=fields)
+    except Exception as e:
+        return jsonify({
+            "status" : False,
+            "error" : str(e)
+        }), 400
+
+    def generate():
+        for index, (body, error) in enumerate(results):
+            if body is not None:
+                yield b'{"data":' + body + b',"index":%d,"status":true}\n' % index
+            else:
+                yield json.dumps({"error": error, "index": index, "status": False}, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    return Response(generate(), status=200, mimetype="application/x-ndjson")
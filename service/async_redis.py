@@ -0,0 +1,49 @@
+class AsyncRedis:
+    """Awaitable facade over a redis.asyncio client living on the background loop.
+
+    Commands are awaited from any request's event loop and executed on the
+    shared background loop that owns the connection pool, so every request
+    uses the same pool without a thread hop per command:
+
+        body = await redis_client.get(key)
+        values = await redis_client.run(lambda client: client.mget(keys))
+    """
+
+    def __init__(self, client, background_loop):
+        self.client = client
+        self.background_loop = background_loop
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+        if not callable(command):
+            return command
+
+        async def call(*args, **kwargs):
+            return await self.background_loop.run(command(*args, **kwargs))
+
+        call.__name__ = name
+        return call
+
+    async def run(self, fn):
+        """Run `await fn(client)` on the background loop, e.g. to build and execute a pipeline"""
+        async def runner():
+            return await fn(self.client)
+        return await self.background_loop.run(runner())
+
+    def pool_stats(self) -> dict:
+        """Connections in use and idle in the pool, against its limit"""
+        # redis-py keeps these lists private, so read them defensively
+        pool = self.client.connection_pool
+        return {
+            'in_use_connections': len(getattr(pool, '_in_use_connections', ()) or ()),
+            'idle_connections': len(getattr(pool, '_available_connections', ()) or ()),
+            'max_connections': pool.max_connections
+        }
+
+    async def pipeline(self, build, transaction: bool = False):
+        """Queue commands with `build(pipe)` and send them in one round trip"""
+        async def execute(client):
+            async with client.pipeline(transaction=transaction) as pipe:
+                build(pipe)
+                return await pipe.execute()
+        return await self.run(execute)
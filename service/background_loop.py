@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+
+class BackgroundLoop:
+    """An event loop on a daemon thread that outlives individual requests.
+
+    Flask runs every async view on a fresh event loop, and loop-bound
+    resources such as httpx or redis.asyncio connection pools cannot be
+    shared between loops. Resources meant to live for the whole app are
+    created and used on this loop instead; request code hands coroutines
+    over with `run()` and awaits the result from its own loop.
+    """
+
+    def __init__(self, name: str = "weather-background-loop"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    @property
+    def loop(self):
+        self.start()
+        return self._loop
+
+    def start(self):
+        if self._loop is not None:
+            return
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_forever():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(target=run_forever, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop = loop
+
+    def submit(self, coro):
+        """Schedule a coroutine on the background loop; returns a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run(self, coro):
+        """Run a coroutine on the background loop and await it from the caller's loop"""
+        return await asyncio.wrap_future(self.submit(coro))
+
+    def stop(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+
+_background_loop = None
+_background_loop_lock = threading.Lock()
+
+def get_background_loop():
+    """Get the process-wide background loop; its thread starts on first use"""
+    global _background_loop
+    if _background_loop is None:
+        with _background_loop_lock:
+            if _background_loop is None:
+                _background_loop = BackgroundLoop()
+    return _background_loop
@@ -0,0 +1,30 @@
+from extensions import db
+from config import missing_settings
+from flask.cli import with_appcontext
+from sqlalchemy import inspect
+import click
+
+
+def init_db() -> list:
+    """Create the tables (and their indexes) that do not exist yet; returns their names.
+
+    Existing tables are left as they are, so new columns and indexes on
+    them still need the statements listed in the README.
+    """
+    existing = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    return sorted(set(inspect(db.engine).get_table_names()) - existing)
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Create missing tables. Run once per deploy, before starting the app."""
+    missing = missing_settings()
+    if missing:
+        click.echo(f"Warning: {', '.join(missing)} not set")
+    created = init_db()
+    if created:
+        click.echo(f"Created tables: {', '.join(created)}")
+    else:
+        click.echo("Database schema is up to date")
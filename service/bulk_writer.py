@@ -0,0 +1,282 @@
+from models.weather import Weather, CurrentConditions, Station, HourlyBlock
+from models.hourly_codec import encode_hours
+from service.statement_counter import count_statements
+from sqlalchemy import insert, update
+from datetime import datetime
+import os
+import time
+import uuid
+
+# "rows" stores one current_conditions row per hour; "compact" packs each
+# day's hours into a single hourly_block record
+HOURLY_STORAGE_MODES = ("rows", "compact")
+
+
+class SaveStats:
+    """Rows and statements issued by a single bulk save"""
+
+    def __init__(self):
+        self.rows = 0
+        # Rows skipped because their stored values were already current (upsert mode)
+        self.unchanged = 0
+        self.statements = 0
+        self.elapsed_ms = 0.0
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'unchanged': self.unchanged,
+            'statements': self.statements,
+            'elapsed_ms': round(self.elapsed_ms, 3)
+        }
+
+
+class BulkWeatherWriter:
+    """Persists a whole timeline payload in a fixed number of statements.
+
+    Ids are generated up front so no flush is needed to learn them; the
+    weather, condition and station rows then go out as executemany inserts,
+    which SQLAlchemy batches into multi-row INSERT ... VALUES statements.
+    """
+
+    def __init__(self, session, hourly_storage: str = None):
+        self.session = session
+        self.hourly_storage = hourly_storage or os.getenv("WEATHER_HOURLY_STORAGE", "rows")
+        if self.hourly_storage not in HOURLY_STORAGE_MODES:
+            raise ValueError(f"Unknown hourly storage mode: {self.hourly_storage}")
+        self.last_stats = None
+
+    def save(self, data: dict, location_key: str = None):
+        """Insert the payload and commit; returns the rows that were written"""
+        return self.save_many([(data, location_key)])[0]
+
+    def save_many(self, items):
+        """Insert several (payload, location_key) pairs in one transaction.
+
+        The statement count does not grow with the number of payloads; returns
+        a (weather_row, condition_rows, station_rows) tuple per payload.
+        """
+        return self.write([self.build(data, location_key) for data, location_key in items])
+
+    def build(self, data: dict, location_key: str = None):
+        """Rows for one payload, with the ids this writer stores them under"""
+        return build_rows(data, location_key)
+
+    def write(self, written):
+        """Insert rows from build() in one transaction and commit; returns them unchanged"""
+        stats = SaveStats()
+        started = time.perf_counter()
+
+        weather_rows = []
+        condition_rows = []
+        block_rows = []
+        station_rows = []
+        current_links = []
+        for weather_row, conditions, stations in written:
+            weather_rows.append({**weather_row, 'current_conditions_id': None})
+            if self.hourly_storage == "compact":
+                condition_rows.extend(row for row in conditions if not row['parent_id'])
+                block_rows.extend(hourly_block_rows(conditions))
+            else:
+                condition_rows.extend(conditions)
+            station_rows.extend(stations)
+            if weather_row['current_conditions_id']:
+                current_links.append({
+                    'id': weather_row['id'],
+                    'current_conditions_id': weather_row['current_conditions_id']
+                })
+
+        with count_statements(self.session.connection()) as counter:
+            # weather and current_conditions reference each other, so the
+            # weather rows go in first and are pointed at their current
+            # conditions once those exist
+            self.session.execute(bulk_insert(Weather), weather_rows)
+            if condition_rows:
+                self.session.execute(bulk_insert(CurrentConditions), condition_rows)
+            if block_rows:
+                self.session.execute(bulk_insert(HourlyBlock), block_rows)
+            if current_links:
+                # ORM bulk UPDATE by primary key, sent as one executemany
+                self.session.execute(update(Weather), current_links)
+            if station_rows:
+                self.session.execute(bulk_insert(Station), station_rows)
+            self.session.commit()
+
+        stats.statements = counter.statements
+        stats.rows = len(weather_rows) + len(condition_rows) + len(block_rows) + len(station_rows)
+        stats.elapsed_ms = (time.perf_counter() - started) * 1000
+        self.last_stats = stats
+        return written
+
+
+def bulk_insert(model):
+    """ORM bulk INSERT that sends None as NULL.
+
+    By default the ORM leaves None values out of the parameters, so rows
+    that differ only in which columns are null (preciptype, windgust, ...)
+    land in separate statements. Rendering the nulls keeps every row in
+    one batch.
+    """
+    return insert(model).execution_options(render_nulls=True)
+
+
+def build_rows(data: dict, location_key: str = None):
+    """Turn a Visual Crossing timeline payload into plain row dicts"""
+    weather_id = str(uuid.uuid4())
+    weather_row = {
+        'id': weather_id,
+        'query_cost': data.get('queryCost'),
+        'latitude': data.get('latitude'),
+        'longitude': data.get('longitude'),
+        'resolved_address': data.get('resolvedAddress'),
+        'address': data.get('address'),
+        'timezone': data.get('timezone'),
+        'tzoffset': data.get('tzoffset'),
+        'description': data.get('description'),
+        'alerts': data.get('alerts'),
+        'location_key': location_key,
+        'first_day_epoch': None,
+        'current_conditions_id': None
+    }
+
+    # Parents are emitted before their children so a multi-row INSERT
+    # split into several batches never references a row not yet written
+    current_id = None
+    condition_rows = []
+    if data.get('currentConditions'):
+        current_row = condition_row(data['currentConditions'], weather_id, None)
+        current_id = current_row['id']
+        condition_rows.append(current_row)
+
+    hour_rows = []
+    for day_data in data.get('days') or []:
+        day_row = condition_row(day_data, weather_id, None)
+        condition_rows.append(day_row)
+        for hour_data in day_data.get('hours') or []:
+            hour_rows.append(condition_row(hour_data, weather_id, day_row['id']))
+    condition_rows.extend(hour_rows)
+    day_epochs = [row['datetime_epoch'] for row in condition_rows if not row['parent_id'] and row['id'] != current_id]
+    weather_row['first_day_epoch'] = min(day_epochs, default=None)
+
+    station_rows = []
+    for station_key, station_data in (data.get('stations') or {}).items():
+        station_rows.append({
+            'id': str(uuid.uuid4()),
+            'distance': station_data.get('distance'),
+            'latitude': station_data.get('latitude'),
+            'longitude': station_data.get('longitude'),
+            'use_count': station_data.get('useCount'),
+            'station_id': station_key,
+            'name': station_data.get('name'),
+            'quality': station_data.get('quality'),
+            'contribution': station_data.get('contribution'),
+            'weather_id': weather_id
+        })
+
+    weather_row['current_conditions_id'] = current_id
+    return weather_row, condition_rows, station_rows
+
+
+def hourly_block_rows(condition_rows):
+    """Group a payload's hour rows by day into packed hourly_block rows"""
+    hours_by_day = {}
+    for row in condition_rows:
+        if row['parent_id']:
+            hours_by_day.setdefault(row['parent_id'], []).append(row)
+
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'day_id': day_id,
+            'weather_id': hours[0]['weather_id'],
+            'hour_count': len(hours),
+            'data': encode_hours(hours)
+        }
+        for day_id, hours in hours_by_day.items()
+    ]
+
+
+def weather_from_rows(weather_row, condition_rows, station_rows) -> Weather:
+    """Build a detached Weather tree from row dicts without touching the DB"""
+    weather = Weather(**weather_row)
+    conditions = {row['id']: CurrentConditions(**row) for row in condition_rows}
+
+    days = []
+    for row in condition_rows:
+        condition = conditions[row['id']]
+        if row['parent_id']:
+            conditions[row['parent_id']].hours.append(condition)
+        elif row['id'] != weather_row['current_conditions_id']:
+            days.append(condition)
+
+    weather.days = days
+    if weather_row['current_conditions_id']:
+        weather.current_conditions = conditions[weather_row['current_conditions_id']]
+    weather.stations = [Station(**row) for row in station_rows]
+    return weather
+
+
+def condition_row(data: dict, weather_id: str, parent_id: str = None) -> dict:
+    """Map a day/hour/current block of the payload to a current_conditions row"""
+    datetime_str = data.get('datetime')
+    datetime_epoch = data.get('datetimeEpoch')
+
+    if datetime_epoch:
+        current_datetime = datetime.fromtimestamp(datetime_epoch)
+    elif datetime_str:
+        try:
+            current_datetime = datetime.fromisoformat(datetime_str)
+        except:
+            current_datetime = datetime.now()
+    else:
+        current_datetime = datetime.now()
+
+    return {
+        'id': str(uuid.uuid4()),
+        'current_conditions_datetime': current_datetime,
+        'datetime_epoch': datetime_epoch or 0,
+        'temp': data.get('temp', 0.0),
+        'feelslike': data.get('feelslike', 0.0),
+        'humidity': data.get('humidity', 0.0),
+        'dew': data.get('dew', 0.0),
+        'precip': data.get('precip'),  # Can be None/null
+        'precipprob': data.get('precipprob', 0.0),
+        'snow': data.get('snow', 0.0),
+        'snowdepth': data.get('snowdepth', 0.0),
+        'preciptype': ','.join(data.get('preciptype', [])) if data.get('preciptype') else None,
+        'windgust': data.get('windgust'),
+        'windspeed': data.get('windspeed', 0.0),
+        'winddir': data.get('winddir', 0.0),
+        'pressure': data.get('pressure', 0.0),
+        'visibility': data.get('visibility', 0.0),
+        'cloudcover': data.get('cloudcover', 0.0),
+        'solarradiation': data.get('solarradiation', 0.0),
+        'solarenergy': data.get('solarenergy', 0.0),
+        'uvindex': data.get('uvindex', 0),
+        'conditions': data.get('conditions', ''),
+        'icon': data.get('icon', ''),
+        'stations': data.get('stations'),
+        'source': data.get('source', ''),
+        'sunrise': parse_time_to_datetime(data.get('sunrise')) if data.get('sunrise') else None,
+        'sunrise_epoch': data.get('sunriseEpoch'),
+        'sunset': parse_time_to_datetime(data.get('sunset')) if data.get('sunset') else None,
+        'sunset_epoch': data.get('sunsetEpoch'),
+        'moonphase': data.get('moonphase'),
+        'tempmax': data.get('tempmax'),
+        'tempmin': data.get('tempmin'),
+        'feelslikemax': data.get('feelslikemax'),
+        'feelslikemin': data.get('feelslikemin'),
+        'precipcover': data.get('precipcover'),
+        'severerisk': data.get('severerisk'),
+        'description': data.get('description'),
+        'weather_id': weather_id,
+        'parent_id': parent_id
+    }
+
+
+def parse_time_to_datetime(time_str: str):
+    """Parse time string to datetime object"""
+    try:
+        return datetime.strptime(time_str, "%H:%M:%S")
+    except:
+        return None
@@ -0,0 +1,147 @@
+"""Compressed, versioned encoding of the bodies stored in Redis.
+
+An encoded value is PREFIX (magic, format version, algorithm id) followed
+by the compressed body. Bodies are compact JSON objects and always start
+with "{", so a value without the magic is a legacy plain entry and is
+returned as it is; entries written before compression was enabled keep
+being served until they expire.
+
+Only the Redis copy is compressed: L1 holds decoded bodies, so an L1 hit
+costs nothing extra and an L2 hit pays one decompression.
+"""
+import os
+import struct
+import threading
+import time
+import zlib
+
+MAGIC = b"WC"
+VERSION = 1
+PREFIX = struct.Struct("<2sBB")
+
+ALGORITHM_IDS = {"zlib": 1, "zstd": 2}
+ALGORITHMS = ("none",) + tuple(ALGORITHM_IDS)
+DEFAULT_LEVELS = {"zlib": 6, "zstd": 3}
+
+
+def zstd_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CacheCodecError(Exception):
+    pass
+
+
+class CacheCodec:
+    """Encodes bodies for Redis and decodes them back, counting bytes and time spent"""
+
+    def __init__(self, algorithm: str = "zlib", level: int = None, min_bytes: int = 1024):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown cache codec: {algorithm}")
+        if algorithm == "zstd" and not zstd_available():
+            raise ValueError("cache codec zstd needs the zstandard package")
+        self.algorithm = algorithm
+        self.level = level if level is not None else DEFAULT_LEVELS.get(algorithm)
+        # Smaller bodies are stored plain; compressing them saves too little
+        self.min_bytes = min_bytes
+        self._lock = threading.Lock()
+        # zstandard (de)compressors must not be shared between threads
+        self._local = threading.local()
+        self.stats = {
+            'encoded': 0,
+            'stored_plain': 0,
+            'decoded': 0,
+            'legacy_reads': 0,
+            'decode_errors': 0,
+            'raw_bytes': 0,
+            'stored_bytes': 0,
+            'encode_ms': 0.0,
+            'decode_ms': 0.0
+        }
+
+    @classmethod
+    def from_env(cls):
+        algorithm = os.getenv("WEATHER_CACHE_CODEC", "auto")
+        if algorithm == "auto":
+            algorithm = "zstd" if zstd_available() else "zlib"
+        level = os.getenv("WEATHER_CACHE_CODEC_LEVEL")
+        return cls(
+            algorithm=algorithm,
+            level=int(level) if level else None,
+            min_bytes=int(os.getenv("WEATHER_CACHE_CODEC_MIN_BYTES", "1024"))
+        )
+
+    def _zstd(self, kind: str):
+        coder = getattr(self._local, kind, None)
+        if coder is None:
+            import zstandard
+            coder = zstandard.ZstdCompressor(level=self.level) if kind == "compressor" else zstandard.ZstdDecompressor()
+            setattr(self._local, kind, coder)
+        return coder
+
+    def encode(self, body: bytes) -> bytes:
+        started = time.perf_counter()
+        if self.algorithm == "none" or len(body) < self.min_bytes:
+            value = body
+        elif self.algorithm == "zstd":
+            value = PREFIX.pack(MAGIC, VERSION, ALGORITHM_IDS["zstd"]) + self._zstd("compressor").compress(body)
+        else:
+            value = PREFIX.pack(MAGIC, VERSION, ALGORITHM_IDS["zlib"]) + zlib.compress(body, self.level)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            self.stats['encoded' if value is not body else 'stored_plain'] += 1
+            self.stats['raw_bytes'] += len(body)
+            self.stats['stored_bytes'] += len(value)
+            self.stats['encode_ms'] += elapsed_ms
+        return value
+
+    def decode(self, value: bytes) -> bytes:
+        """Body for a stored value; raises CacheCodecError if it cannot be decoded here"""
+        if not value.startswith(MAGIC):
+            with self._lock:
+                self.stats['legacy_reads'] += 1
+            return value
+
+        started = time.perf_counter()
+        try:
+            _, version, algorithm_id = PREFIX.unpack_from(value)
+            if version != VERSION:
+                raise CacheCodecError(f"Unsupported cache entry version: {version}")
+            payload = memoryview(value)[PREFIX.size:]
+            if algorithm_id == ALGORITHM_IDS["zlib"]:
+                body = zlib.decompress(payload)
+            elif algorithm_id == ALGORITHM_IDS["zstd"]:
+                if not zstd_available():
+                    raise CacheCodecError("cache entry is zstd-compressed but zstandard is not installed")
+                body = self._zstd("decompressor").decompress(payload)
+            else:
+                raise CacheCodecError(f"Unknown cache entry algorithm: {algorithm_id}")
+        except CacheCodecError:
+            self._count_error()
+            raise
+        except Exception as e:
+            self._count_error()
+            raise CacheCodecError(str(e))
+
+        with self._lock:
+            self.stats['decoded'] += 1
+            self.stats['decode_ms'] += (time.perf_counter() - started) * 1000
+        return body
+
+    def _count_error(self):
+        with self._lock:
+            self.stats['decode_errors'] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['bytes_saved'] = stats['raw_bytes'] - stats['stored_bytes']
+        stats['ratio'] = round(stats['stored_bytes'] / stats['raw_bytes'], 4) if stats['raw_bytes'] else 1.0
+        stats['encode_ms'] = round(stats['encode_ms'], 3)
+        stats['decode_ms'] = round(stats['decode_ms'], 3)
+        return stats
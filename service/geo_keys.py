@@ -0,0 +1,99 @@
+import os
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat: float, long: float, precision: int) -> str:
+    """Encode a coordinate as a geohash of `precision` characters"""
+    lat_range = [-90.0, 90.0]
+    long_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        value, bounds = (long, long_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits = bits << 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_decode(geohash: str):
+    """Return the (lat, long) centre of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    long_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        index = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bounds = long_range if even else lat_range
+            mid = (bounds[0] + bounds[1]) / 2
+            if (index >> shift) & 1:
+                bounds[0] = mid
+            else:
+                bounds[1] = mid
+            even = not even
+
+    return (lat_range[0] + lat_range[1]) / 2, (long_range[0] + long_range[1]) / 2
+
+
+class SpatialKeyScheme:
+    """Maps raw coordinates to a spatial cell used for cache keys and DB lookups.
+
+    "round" cells are coordinates rounded to `precision` decimals (3 decimals
+    is roughly 110 m); "geohash" cells are geohashes of `precision` characters
+    (7 characters is roughly 150 m). With `snap` on, the upstream query is
+    made for the cell centre, so every point in a cell gets the same forecast
+    no matter which client happened to fill the cache.
+    """
+
+    SCHEMES = ("round", "geohash")
+
+    def __init__(self, scheme: str = "round", precision: int = 3, snap: bool = True):
+        if scheme not in self.SCHEMES:
+            raise ValueError(f"Unknown spatial key scheme: {scheme}")
+        self.scheme = scheme
+        self.precision = precision
+        self.snap = snap
+
+    @classmethod
+    def from_env(cls):
+        scheme = os.getenv("WEATHER_KEY_SCHEME", "round")
+        default_precision = "7" if scheme == "geohash" else "3"
+        return cls(
+            scheme=scheme,
+            precision=int(os.getenv("WEATHER_KEY_PRECISION", default_precision)),
+            snap=os.getenv("WEATHER_KEY_SNAP", "1") not in ("0", "false", "False")
+        )
+
+    def cell(self, lat: float, long: float):
+        """Return (location_key, query_lat, query_long) for a coordinate"""
+        if self.scheme == "geohash":
+            geohash = geohash_encode(lat, long, self.precision)
+            location_key = f"gh{self.precision}:{geohash}"
+            if self.snap:
+                centre_lat, centre_long = geohash_decode(geohash)
+                return location_key, round(centre_lat, 6), round(centre_long, 6)
+            return location_key, lat, long
+
+        # + 0.0 turns -0.0 into 0.0 so both sides of the equator share a key
+        cell_lat = round(lat, self.precision) + 0.0
+        cell_long = round(long, self.precision) + 0.0
+        location_key = f"r{self.precision}:{cell_lat:.{self.precision}f}:{cell_long:.{self.precision}f}"
+        if self.snap:
+            return location_key, cell_lat, cell_long
+        return location_key, lat, long
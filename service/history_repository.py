@@ -0,0 +1,218 @@
+from models.weather import Weather, CurrentConditions, HourlyBlock
+from models.hourly_codec import decode_hours
+from models.serialization import CONDITIONS_PLAN
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import aliased
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Keys every hourly series record carries, whatever fields were asked for
+SERIES_KEYS = frozenset(('datetime', 'datetime_epoch'))
+
+# Candidates read from the bounding box before exact distances are checked
+NEAREST_CANDIDATES = 20
+
+
+def haversine_km(lat1: float, long1: float, lat2: float, long2: float) -> float:
+    lat1, long1, lat2, long2 = map(math.radians, (lat1, long1, lat2, long2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class HistoryRepository:
+    """Time-range and spatial reads over every stored forecast for a location.
+
+    A location's history is spread over its snapshots (or, in upsert mode,
+    over the days its single tree has accumulated), so the same hour or
+    day can be stored more than once. Each query keeps only the copy from
+    the most recently updated forecast, ranking duplicates with a window
+    function in SQL. Aggregates are computed by the database too; only the
+    rows of the result are ever loaded.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    def _latest_copy(self, condition, *columns, partition_by):
+        """Rows of `condition` for a location, ranked 1 for the newest copy of each `partition_by` value"""
+        return select(
+            *columns,
+            func.row_number().over(
+                partition_by=partition_by,
+                order_by=(Weather.updated_at.desc(), Weather.id)
+            ).label('copy')
+        ).select_from(condition).join(Weather, condition.weather_id == Weather.id)
+
+    def hourly_series(self, location_key: str, start_epoch: int, end_epoch: int, fields=None) -> list:
+        """Hour records of a location between two epochs (inclusive), oldest first.
+
+        `fields` narrows each record to those CurrentConditions.to_dict()
+        keys; datetime and datetime_epoch are always included. Only the
+        selected columns are read.
+        """
+        plan = CONDITIONS_PLAN.project(SERIES_KEYS.union(fields) if fields else CONDITIONS_PLAN.keys)
+        columns = [getattr(CurrentConditions, column).label(key) for column, key in plan.fields]
+        ranked = self._latest_copy(
+            CurrentConditions, *columns,
+            partition_by=CurrentConditions.datetime_epoch
+        ).where(
+            Weather.location_key == location_key,
+            CurrentConditions.parent_id.is_not(None),
+            CurrentConditions.datetime_epoch.between(start_epoch, end_epoch)
+        ).subquery()
+
+        series = {
+            row['datetime_epoch']: dict(row)
+            for row in self.session.execute(
+                select(*(ranked.c[key] for key in plan.keys)).where(ranked.c.copy == 1)
+            ).mappings()
+        }
+
+        # Hours of days stored in compact mode live in hourly blocks, not rows
+        for hour in self._block_hours(location_key, start_epoch, end_epoch):
+            if start_epoch <= hour['datetime_epoch'] <= end_epoch and hour['datetime_epoch'] not in series:
+                series[hour['datetime_epoch']] = plan.pick(hour)
+
+        return [series[epoch] for epoch in sorted(series)]
+
+    def _block_hours(self, location_key: str, start_epoch: int, end_epoch: int):
+        day = CurrentConditions
+        ranked = self._latest_copy(
+            day, HourlyBlock.data,
+            partition_by=day.datetime_epoch
+        ).join(HourlyBlock, HourlyBlock.day_id == day.id).where(
+            Weather.location_key == location_key,
+            day.parent_id.is_(None),
+            # A day's hours start at its own epoch and span at most a day
+            day.datetime_epoch.between(start_epoch - 86400, end_epoch)
+        ).subquery()
+
+        for data in self.session.execute(select(ranked.c.data).where(ranked.c.copy == 1)).scalars():
+            yield from decode_hours(data)
+
+    def daily_aggregates(self, location_key: str, start_epoch: int, end_epoch: int) -> list:
+        """Per-day temperature min/max/avg and precipitation total for days starting between two epochs.
+
+        Computed in SQL from the day's hour rows. Days whose hours are only
+        stored as compact blocks report the daily values Visual Crossing
+        sent for the day instead (source "day").
+        """
+        hour = CurrentConditions
+        day = aliased(CurrentConditions)
+        ranked_hours = self._latest_copy(
+            hour,
+            day.datetime_epoch.label('day_epoch'),
+            day.current_conditions_datetime.label('day_datetime'),
+            hour.temp,
+            hour.precip,
+            partition_by=hour.datetime_epoch
+        ).join(day, hour.parent_id == day.id).where(
+            Weather.location_key == location_key,
+            day.datetime_epoch.between(start_epoch, end_epoch)
+        ).subquery()
+
+        aggregates = {}
+        for row in self.session.execute(
+            select(
+                ranked_hours.c.day_epoch,
+                func.min(ranked_hours.c.day_datetime).label('day_datetime'),
+                func.min(ranked_hours.c.temp).label('temp_min'),
+                func.max(ranked_hours.c.temp).label('temp_max'),
+                func.avg(ranked_hours.c.temp).label('temp_avg'),
+                func.coalesce(func.sum(ranked_hours.c.precip), 0.0).label('precip_total'),
+                func.count().label('hours')
+            )
+            .where(ranked_hours.c.copy == 1)
+            .group_by(ranked_hours.c.day_epoch)
+        ).mappings():
+            aggregates[row['day_epoch']] = self._aggregate(row, source="hours")
+
+        ranked_days = self._latest_copy(
+            day,
+            day.datetime_epoch.label('day_epoch'),
+            day.current_conditions_datetime.label('day_datetime'),
+            day.tempmin.label('temp_min'),
+            day.tempmax.label('temp_max'),
+            day.temp.label('temp_avg'),
+            func.coalesce(day.precip, 0.0).label('precip_total'),
+            partition_by=day.datetime_epoch
+        ).where(
+            Weather.location_key == location_key,
+            day.parent_id.is_(None),
+            # The current conditions row is not a day
+            or_(Weather.current_conditions_id.is_(None), day.id != Weather.current_conditions_id),
+            day.datetime_epoch.between(start_epoch, end_epoch)
+        ).subquery()
+
+        for row in self.session.execute(
+            select(ranked_days).where(ranked_days.c.copy == 1)
+        ).mappings():
+            if row['day_epoch'] not in aggregates:
+                aggregates[row['day_epoch']] = self._aggregate({**row, 'hours': 0}, source="day")
+
+        return [aggregates[epoch] for epoch in sorted(aggregates)]
+
+    @staticmethod
+    def _aggregate(row, source: str) -> dict:
+        day_datetime = row['day_datetime']
+        return {
+            'date': day_datetime.date().isoformat() if day_datetime else None,
+            'datetime_epoch': row['day_epoch'],
+            'temp_min': row['temp_min'],
+            'temp_max': row['temp_max'],
+            'temp_avg': round(row['temp_avg'], 2) if row['temp_avg'] is not None else None,
+            'precip_total': round(row['precip_total'], 3),
+            'hours': row['hours'],
+            'source': source
+        }
+
+    def nearest_location(self, lat: float, long: float, radius_km: float):
+        """Closest stored location within radius_km of a point, or None.
+
+        A bounding box on (latitude, longitude) narrows the search through
+        its index; candidates are ordered by an equirectangular distance in
+        SQL and the closest is confirmed with the haversine distance.
+        Boxes crossing the antimeridian are not wrapped. Forecasts without
+        a location key are never returned.
+        """
+        lat_delta = radius_km / KM_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        long_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+        squared_distance = (
+            (Weather.latitude - lat) * (Weather.latitude - lat)
+            + (Weather.longitude - long) * (Weather.longitude - long) * (cos_lat * cos_lat)
+        )
+
+        candidates = self.session.execute(
+            select(Weather.id, Weather.location_key, Weather.latitude, Weather.longitude, Weather.updated_at)
+            .where(
+                and_(
+                    # Forecasts stored before location keys existed have none to look up
+                    Weather.location_key.is_not(None),
+                    Weather.latitude.between(lat - lat_delta, lat + lat_delta),
+                    Weather.longitude.between(long - long_delta, long + long_delta)
+                )
+            )
+            .order_by(squared_distance, Weather.updated_at.desc())
+            .limit(NEAREST_CANDIDATES)
+        ).all()
+
+        best = None
+        for candidate in candidates:
+            distance = haversine_km(lat, long, candidate.latitude, candidate.longitude)
+            if distance <= radius_km and (best is None or distance < best[0]):
+                best = (distance, candidate)
+        if best is None:
+            return None
+
+        distance, candidate = best
+        return {
+            'weather_id': candidate.id,
+            'location_key': candidate.location_key,
+            'latitude': candidate.latitude,
+            'longitude': candidate.longitude,
+            'distance_km': round(distance, 3),
+            'updated_at': candidate.updated_at
+        }
@@ -0,0 +1,196 @@
+from bisect import bisect_left
+from contextlib import nullcontext
+import os
+import threading
+import time
+
+# Upper bounds in seconds, spanning an L1 hit to a slow upstream fetch
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Returned by span() while metrics are disabled, so timing a stage costs one attribute check
+NOOP_SPAN = nullcontext()
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label_names=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series = {}
+
+    def observe(self, labels, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                label_text = _format_labels(self.label_names, labels, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class _Span:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.histogram.observe(self.labels, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """Process-wide request metrics, rendered in the Prometheus text format.
+
+    Stages of a request are timed with spans that work across awaits:
+
+        with metrics.span("upstream_fetch"):
+            response = await self.upstream.get(url)
+
+    When disabled, span() hands back a shared no-op context and counters are
+    not touched, so instrumented code pays for little more than the call.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stage_seconds = Histogram(
+            "weather_stage_seconds", "Time spent in each stage of serving a forecast", ("stage",)
+        )
+        self.request_seconds = Histogram(
+            "weather_request_seconds", "HTTP request latency until the response is returned",
+            ("endpoint", "method", "status")
+        )
+        self.cache_requests = Counter(
+            "weather_cache_requests_total", "Forecast lookups by cache outcome (hit, stale, miss)", ("result",)
+        )
+        self.upstream_query_cost = Counter(
+            "weather_upstream_query_cost_total", "Visual Crossing queryCost of fetched timelines"
+        )
+
+    @classmethod
+    def from_env(cls):
+        return cls(enabled=os.getenv("WEATHER_METRICS_ENABLED", "1") not in ("0", "false", "False"))
+
+    def span(self, stage: str):
+        if not self.enabled:
+            return NOOP_SPAN
+        return _Span(self.stage_seconds, (stage,))
+
+    def count_cache(self, result: str):
+        if self.enabled:
+            self.cache_requests.inc((result,))
+
+    def add_query_cost(self, cost):
+        if self.enabled and cost:
+            self.upstream_query_cost.inc(amount=cost)
+
+    def cache_hit_ratio(self):
+        hits = self.cache_requests.get(("hit",)) + self.cache_requests.get(("stale",))
+        total = hits + self.cache_requests.get(("miss",))
+        return hits / total if total else 0.0
+
+    def init_app(self, app):
+        """Time every request from before_request to the response being returned"""
+        if not self.enabled:
+            return
+        from flask import g, request
+
+        @app.before_request
+        def start_timer():
+            g.metrics_started = time.perf_counter()
+
+        @app.after_request
+        def record_request(response):
+            started = g.pop("metrics_started", None)
+            if started is not None:
+                self.request_seconds.observe(
+                    (request.url_rule.rule if request.url_rule else "unmatched", request.method, str(response.status_code)),
+                    time.perf_counter() - started
+                )
+            return response
+
+    def render(self, gauges=()):
+        """Exposition text for the built-in metrics plus `gauges`: (name, help, [(labels dict, value)])"""
+        lines = []
+        for metric in (self.stage_seconds, self.request_seconds, self.cache_requests, self.upstream_query_cost):
+            lines.extend(metric.render())
+
+        lines.extend([
+            "# HELP weather_cache_hit_ratio Share of forecast lookups served from the cache",
+            "# TYPE weather_cache_hit_ratio gauge",
+            f"weather_cache_hit_ratio {_format_value(self.cache_hit_ratio())}"
+        ])
+        for name, help, samples in gauges:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                label_text = _format_labels(tuple(labels), tuple(labels.values()))
+                lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics.from_env()
@@ -0,0 +1,281 @@
+"""Scheduled prefetch of a known set of locations.
+
+The locations users ask for most (stores, depots) are listed in a file;
+the prefetch worker warms the cache for all of them once, then keeps
+refreshing each one on its own jittered schedule so the entries never go
+stale and never expire together. Fetches go through WeatherService, so
+they are persisted and cached exactly like a request miss.
+"""
+from extensions import get_async_redis_client
+from flask.cli import with_appcontext
+from service.weather_service import CACHE_KEY_PREFIX, CACHE_SOFT_TTL, WeatherService
+import asyncio
+import click
+import csv
+import heapq
+import json
+import os
+import random
+import time
+
+
+def _coordinate(item):
+    if isinstance(item, dict):
+        longitude = item.get("longitude", item.get("longitiude"))
+        return float(item["latitude"]), float(longitude)
+    return float(item[0]), float(item[1])
+
+
+def load_locations(path: str) -> list:
+    """(latitude, longitude) pairs from a JSON list or a CSV file.
+
+    JSON entries are [latitude, longitude] pairs or objects with latitude
+    and longitude (or longitiude) keys. CSV rows start with latitude and
+    longitude; a header row, blank lines and lines starting with # are
+    skipped, and further columns (e.g. a name) are ignored.
+    """
+    with open(path, newline="") as f:
+        if path.endswith(".json"):
+            return [_coordinate(item) for item in json.load(f)]
+
+        locations = []
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            try:
+                locations.append(_coordinate(row))
+            except ValueError:
+                if locations:
+                    raise
+                # Header row
+        return locations
+
+
+class QueryCostBudget:
+    """Token bucket over the upstream queryCost quota.
+
+    Refills at per_day / 86400 per second up to `burst`. A fetch reserves
+    its expected cost before it starts and settles the queryCost it was
+    actually charged afterwards. per_day <= 0 disables the budget.
+    """
+
+    def __init__(self, per_day: float = 0, burst: float = None):
+        self.per_day = per_day
+        self.rate = per_day / 86400
+        self.burst = burst if burst is not None else max(per_day / 24, 1)
+        self.tokens = self.burst
+        self.waited = 0.0
+        self._updated = time.monotonic()
+
+    @classmethod
+    def from_env(cls, per_day: float = None):
+        burst = os.getenv("WEATHER_PREFETCH_QUERY_BURST")
+        return cls(
+            per_day=per_day if per_day is not None else float(os.getenv("WEATHER_PREFETCH_QUERY_BUDGET", "0")),
+            burst=float(burst) if burst else None
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_day > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def reserve(self, cost: float):
+        if not self.enabled:
+            return
+        needed = min(cost, self.burst)
+        self._refill()
+        while self.tokens < needed:
+            wait = (needed - self.tokens) / self.rate
+            self.waited += wait
+            await asyncio.sleep(wait)
+            self._refill()
+        self.tokens -= cost
+
+    def settle(self, reserved: float, actual: float):
+        if self.enabled:
+            self.tokens = min(self.burst, self.tokens + reserved - actual)
+
+
+class PrefetchWorker:
+    """Warms and then periodically refreshes the cache for a fixed location set.
+
+    Locations sharing a cache cell are fetched once. At most `concurrency`
+    fetches run together and every fetch is paid for from `budget`. After
+    the warmup each key is first refreshed at a random point of the
+    interval and then every interval * (1 +/- jitter), which spreads the
+    keys' write times and so their expirations.
+    """
+
+    def __init__(self, locations, interval: float = CACHE_SOFT_TTL * 0.8, jitter: float = 0.1,
+                 concurrency: int = 4, budget: QueryCostBudget = None, min_age: float = 60.0,
+                 warmup_timeout: float = 0, report_seconds: float = 10.0):
+        self.entries = self._entries(locations)
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.budget = budget or QueryCostBudget()
+        # A scheduled refresh skips keys another worker refreshed this recently
+        self.min_age = min_age
+        self.warmup_timeout = warmup_timeout
+        self.report_seconds = report_seconds
+        # Running mean of the queryCost of one fetch, reserved up front
+        self.expected_cost = 1.0
+        self._slots = None
+        self._tasks = set()
+        self._last_report = 0.0
+        self._warming = False
+        self.stats = {
+            'locations': len(self.entries),
+            'completed': 0,
+            'fetched': 0,
+            'skipped': 0,
+            'failed': 0,
+            'query_cost': 0
+        }
+
+    @classmethod
+    def from_env(cls, locations):
+        return cls(
+            locations,
+            interval=float(os.getenv("WEATHER_PREFETCH_INTERVAL", str(CACHE_SOFT_TTL * 0.8))),
+            jitter=float(os.getenv("WEATHER_PREFETCH_JITTER", "0.1")),
+            concurrency=int(os.getenv("WEATHER_PREFETCH_CONCURRENCY", "4")),
+            budget=QueryCostBudget.from_env(),
+            min_age=float(os.getenv("WEATHER_PREFETCH_MIN_AGE", "60")),
+            warmup_timeout=float(os.getenv("WEATHER_PREFETCH_WARMUP_TIMEOUT", "0")),
+            report_seconds=float(os.getenv("WEATHER_PREFETCH_REPORT_SECONDS", "10"))
+        )
+
+    @staticmethod
+    def _entries(locations):
+        entries = {}
+        for lat, long in locations:
+            location_key, query_lat, query_long = WeatherService.key_scheme.cell(lat, long)
+            cache_key = f"{CACHE_KEY_PREFIX}:{location_key}"
+            entries.setdefault(cache_key, (cache_key, location_key, query_lat, query_long))
+        return list(entries.values())
+
+    async def _dispatch(self, entry, min_age):
+        """Start refreshing one key once a slot and enough budget are free"""
+        await self._slots.acquire()
+        reserved = self.expected_cost
+        try:
+            await self.budget.reserve(reserved)
+        except BaseException:
+            self._slots.release()
+            raise
+        task = asyncio.create_task(self._refresh(entry, min_age, reserved))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, entry, min_age, reserved):
+        cache_key = entry[0]
+        service = await WeatherService.create()
+        try:
+            body = await service._refresh(*entry, min_age=min_age)
+            self.stats['fetched' if body is not None else 'skipped'] += 1
+        except Exception as e:
+            self.stats['failed'] += 1
+            click.echo(f"Prefetch of {cache_key} failed: {e}", err=True)
+        finally:
+            cost = service.query_cost
+            self.budget.settle(reserved, cost)
+            if cost:
+                self.stats['query_cost'] += cost
+                self.expected_cost += (cost - self.expected_cost) / 8
+            self.stats['completed'] += 1
+            self._slots.release()
+
+    def _report(self, label: str, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_report < self.report_seconds:
+            return
+        self._last_report = now
+        stats = self.stats
+        done = f"{stats['completed']}/{stats['locations']} locations" if self._warming else f"{stats['completed']} refreshes"
+        click.echo(
+            f"{label}: {done} "
+            f"({stats['fetched']} fetched, {stats['skipped']} fresh, {stats['failed']} failed, "
+            f"queryCost {stats['query_cost']:g}, waited {self.budget.waited:.1f}s for budget)"
+        )
+
+    async def warm(self):
+        """Fetch every location that is missing or stale, reporting progress as it goes"""
+        started = time.monotonic()
+        self._last_report = started
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._warming = True
+
+        async def run():
+            for entry in self.entries:
+                await self._dispatch(entry, None)
+                self._report("Prefetch warmup")
+            while self._tasks:
+                await asyncio.wait(set(self._tasks), timeout=self.report_seconds or None)
+                self._report("Prefetch warmup")
+
+        try:
+            await asyncio.wait_for(run(), self.warmup_timeout or None)
+        except asyncio.TimeoutError:
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            click.echo(f"Prefetch warmup stopped after {self.warmup_timeout:g}s")
+        self._report(f"Prefetch warmup done in {time.monotonic() - started:.1f}s", force=True)
+        self._warming = False
+
+    def _next_interval(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def refresh_forever(self):
+        """Refresh every key on its own schedule until cancelled"""
+        # Tasks cancelled by a warmup timeout may not have given their slots back
+        self._slots = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        due = [(now + random.uniform(0, self.interval), index) for index in range(len(self.entries))]
+        heapq.heapify(due)
+        while due:
+            at, index = heapq.heappop(due)
+            delay = at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            heapq.heappush(due, (loop.time() + self._next_interval(), index))
+            await self._dispatch(self.entries[index], self.min_age)
+            self._report("Prefetch")
+
+    async def run(self, once: bool = False):
+        await self.warm()
+        if not once:
+            await self.refresh_forever()
+
+
+@click.command("prefetch-weather")
+@click.option("--locations", "path", default=None, help="JSON or CSV location list (default: WEATHER_PREFETCH_LOCATIONS)")
+@click.option("--once", is_flag=True, help="Warm the cache and exit instead of refreshing on a schedule")
+@click.option("--concurrency", type=int, default=None, help="Fetches to run at once")
+@click.option("--query-budget", type=float, default=None, help="queryCost to spend per day (0: unlimited)")
+@with_appcontext
+def prefetch_weather_command(path, once, concurrency, query_budget):
+    """Warm the weather cache for a location list, then keep it fresh."""
+    path = path or os.getenv("WEATHER_PREFETCH_LOCATIONS")
+    if not path:
+        raise click.UsageError("pass --locations or set WEATHER_PREFETCH_LOCATIONS")
+
+    worker = PrefetchWorker.from_env(load_locations(path))
+    if concurrency is not None:
+        worker.concurrency = concurrency
+    if query_budget is not None:
+        worker.budget = QueryCostBudget.from_env(per_day=query_budget)
+    try:
+        WeatherService(get_async_redis_client())._check_config()
+    except WeatherService.WeatherException as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Prefetching {len(worker.entries)} cells")
+    asyncio.run(worker.run(once=once))
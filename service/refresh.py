@@ -0,0 +1,120 @@
+from service.background_loop import get_background_loop
+import asyncio
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class HotKeyTracker:
+    """Request counts per cache key, with the coordinates needed to refetch it.
+
+    Counts are halved on every decay() so the ranking follows recent
+    traffic; at most max_keys keys are tracked.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._cells = {}
+
+    def record(self, cache_key: str, location_key: str, lat: float, long: float):
+        with self._lock:
+            if cache_key not in self._counts and len(self._counts) >= self.max_keys:
+                return
+            self._counts[cache_key] = self._counts.get(cache_key, 0) + 1
+            self._cells[cache_key] = (location_key, lat, long)
+
+    def top(self, n: int):
+        """The n most requested keys as (cache_key, location_key, lat, long)"""
+        with self._lock:
+            ranked = sorted(self._counts, key=self._counts.get, reverse=True)[:n]
+            return [(key, *self._cells[key]) for key in ranked]
+
+    def decay(self):
+        with self._lock:
+            for key in list(self._counts):
+                self._counts[key] //= 2
+                if not self._counts[key]:
+                    del self._counts[key]
+                    del self._cells[key]
+
+
+class RefreshScheduler:
+    """Runs cache refreshes off the request path, on the background loop.
+
+    refresh_soon() starts at most one refresh per key at a time, and at most
+    `concurrency` refreshes run together; the
+    re-warm loop periodically hands the hottest keys to a callback that
+    refreshes the ones close to expiring.
+    """
+
+    def __init__(self, interval: float = 300.0, top_n: int = 100, concurrency: int = 4):
+        self.interval = interval
+        self.top_n = top_n
+        self.concurrency = concurrency
+        self.hot_keys = HotKeyTracker()
+        self.background_loop = get_background_loop()
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._rewarm_task = None
+        # Only ever awaited on the background loop
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.stats = {
+            'stale_served': 0,
+            'refreshes': 0,
+            'refresh_failures': 0,
+            'rewarm_runs': 0
+        }
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            interval=float(os.getenv("WEATHER_REWARM_INTERVAL", "300")),
+            top_n=int(os.getenv("WEATHER_REWARM_TOP_N", "100")),
+            concurrency=int(os.getenv("WEATHER_REWARM_CONCURRENCY", "4"))
+        )
+
+    def record(self, counter: str):
+        with self._lock:
+            self.stats[counter] += 1
+
+    def refresh_soon(self, key: str, fn):
+        """Schedule `await fn()` in the background unless a refresh of key is already pending"""
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self.background_loop.submit(self._run_refresh(key, fn))
+
+    async def _run_refresh(self, key: str, fn):
+        try:
+            async with self._semaphore:
+                await fn()
+            self.record('refreshes')
+        except Exception:
+            self.record('refresh_failures')
+            logger.exception("Background refresh of %s failed", key)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def ensure_started(self, rewarm):
+        """Start the periodic re-warm loop once; `await rewarm(entries)` gets the top keys"""
+        if self._rewarm_task is not None or self.interval <= 0:
+            return
+        with self._lock:
+            if self._rewarm_task is None:
+                self._rewarm_task = self.background_loop.submit(self._rewarm_loop(rewarm))
+
+    async def _rewarm_loop(self, rewarm):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await rewarm(self.hot_keys.top(self.top_n))
+                self.record('rewarm_runs')
+            except Exception:
+                logger.exception("Cache re-warm failed")
+            self.hot_keys.decay()
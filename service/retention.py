@@ -0,0 +1,123 @@
+from models.weather import Weather, CurrentConditions, Station, HourlyBlock
+from extensions import db
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, select, update
+from datetime import datetime, timedelta, timezone
+import click
+import os
+import time
+
+# Rows deleted per transaction, so pruning never holds locks for long
+PRUNE_CHUNK_SIZE = 500
+
+
+class RetentionJob:
+    """Prunes forecasts that newer data has replaced.
+
+    Two kinds of rows accumulate:
+    - superseded snapshots: in snapshot mode every fetch stores a whole new
+      Weather tree, and only the newest few per location are ever read
+    - history: in upsert mode days that have dropped out of the forecast
+      stay on the location's tree
+
+    Deletes go out in chunks of PRUNE_CHUNK_SIZE, one transaction each.
+    """
+
+    def __init__(self, session, keep_snapshots: int = 1, grace: timedelta = timedelta(hours=1),
+                 max_age: timedelta = timedelta(days=30)):
+        self.session = session
+        self.keep_snapshots = keep_snapshots
+        # Snapshots superseded less than `grace` ago may still be streaming to a client
+        self.grace = grace
+        self.max_age = max_age
+
+    @classmethod
+    def from_env(cls, session):
+        return cls(
+            session,
+            keep_snapshots=int(os.getenv("WEATHER_RETENTION_SNAPSHOTS", "1")),
+            grace=timedelta(minutes=float(os.getenv("WEATHER_RETENTION_GRACE_MINUTES", "60"))),
+            max_age=timedelta(days=float(os.getenv("WEATHER_RETENTION_DAYS", "30")))
+        )
+
+    def superseded_weather_ids(self):
+        """Weather ids older than the newest keep_snapshots for their location"""
+        ranked = select(
+            Weather.id,
+            Weather.updated_at,
+            func.row_number().over(
+                partition_by=Weather.location_key,
+                order_by=Weather.updated_at.desc()
+            ).label('position')
+        ).where(Weather.location_key.is_not(None)).subquery()
+
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - self.grace
+        return self.session.execute(
+            select(ranked.c.id).where(ranked.c.position > self.keep_snapshots, ranked.c.updated_at < cutoff)
+        ).scalars().all()
+
+    def expired_day_ids(self):
+        """Days older than max_age, except rows still serving as current conditions"""
+        cutoff_epoch = int(time.time() - self.max_age.total_seconds())
+        return self.session.execute(
+            select(CurrentConditions.id).where(
+                CurrentConditions.parent_id.is_(None),
+                CurrentConditions.datetime_epoch < cutoff_epoch,
+                CurrentConditions.id.not_in(
+                    select(Weather.current_conditions_id).where(Weather.current_conditions_id.is_not(None))
+                )
+            )
+        ).scalars().all()
+
+    def prune_snapshots(self) -> int:
+        weather_ids = self.superseded_weather_ids()
+        for chunk in _chunks(weather_ids):
+            # weather points at one of its condition rows, so unlink it first
+            self._execute(update(Weather).where(Weather.id.in_(chunk)).values(current_conditions_id=None))
+            self._execute(delete(HourlyBlock).where(HourlyBlock.weather_id.in_(chunk)))
+            self._execute(delete(Station).where(Station.weather_id.in_(chunk)))
+            self._execute(delete(CurrentConditions).where(
+                CurrentConditions.weather_id.in_(chunk), CurrentConditions.parent_id.is_not(None)
+            ))
+            self._execute(delete(CurrentConditions).where(CurrentConditions.weather_id.in_(chunk)))
+            self._execute(delete(Weather).where(Weather.id.in_(chunk)))
+            self.session.commit()
+        return len(weather_ids)
+
+    def prune_history(self) -> int:
+        day_ids = self.expired_day_ids()
+        for chunk in _chunks(day_ids):
+            self._execute(delete(HourlyBlock).where(HourlyBlock.day_id.in_(chunk)))
+            self._execute(delete(CurrentConditions).where(CurrentConditions.parent_id.in_(chunk)))
+            self._execute(delete(CurrentConditions).where(CurrentConditions.id.in_(chunk)))
+            self.session.commit()
+        return len(day_ids)
+
+    def run(self) -> dict:
+        return {
+            'snapshots': self.prune_snapshots(),
+            'days': self.prune_history()
+        }
+
+    def _execute(self, statement):
+        self.session.execute(statement.execution_options(synchronize_session=False))
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), PRUNE_CHUNK_SIZE):
+        yield ids[start:start + PRUNE_CHUNK_SIZE]
+
+
+@click.command("prune-weather")
+@click.option("--keep-snapshots", type=int, default=None, help="Newest snapshots to keep per location")
+@click.option("--max-age-days", type=float, default=None, help="Drop days older than this")
+@with_appcontext
+def prune_weather_command(keep_snapshots, max_age_days):
+    """Delete superseded forecast snapshots and expired days."""
+    job = RetentionJob.from_env(db.session)
+    if keep_snapshots is not None:
+        job.keep_snapshots = keep_snapshots
+    if max_age_days is not None:
+        job.max_age = timedelta(days=max_age_days)
+    pruned = job.run()
+    click.echo(f"Pruned {pruned['snapshots']} snapshots and {pruned['days']} days")
@@ -0,0 +1,102 @@
+import asyncio
+import concurrent.futures
+import threading
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one execution.
+
+    The first caller for a key becomes the leader and runs the work; callers
+    arriving while it is in flight await the leader's result instead.
+    Flask runs each async view on its own event loop, so flights are tracked
+    with thread-safe concurrent futures and awaited through
+    asyncio.wrap_future rather than with loop-bound asyncio futures.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.stats = {
+            'leader': 0,
+            'coalesced': 0,
+            'remote_coalesced': 0
+        }
+
+    def record(self, counter: str):
+        with self._lock:
+            self.stats[counter] += 1
+
+    async def do(self, key: str, fn):
+        """Run `await fn()` once per key among concurrent callers"""
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._flights[key] = future
+                self.stats['leader'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+    async def do_many(self, keys, fn) -> dict:
+        """do() for several keys at once; returns {key: result or exception}.
+
+        `await fn(led_keys)` runs once for the keys no concurrent caller is
+        already resolving and must return {key: result or exception} for them;
+        the other keys await their leaders.
+        """
+        led = {}
+        followed = {}
+        with self._lock:
+            for key in keys:
+                future = self._flights.get(key)
+                if future is None:
+                    future = concurrent.futures.Future()
+                    self._flights[key] = future
+                    led[key] = future
+                    self.stats['leader'] += 1
+                else:
+                    followed[key] = future
+                    self.stats['coalesced'] += 1
+
+        results = {}
+        try:
+            if led:
+                results = await fn(list(led))
+                for key, future in led.items():
+                    outcome = results[key]
+                    if isinstance(outcome, BaseException):
+                        future.set_exception(outcome)
+                    else:
+                        future.set_result(outcome)
+        except BaseException as e:
+            for future in led.values():
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                for key in led:
+                    self._flights.pop(key, None)
+
+        for key, future in followed.items():
+            try:
+                results[key] = await asyncio.wrap_future(future)
+            except Exception as e:
+                results[key] = e
+        return results
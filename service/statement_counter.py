@@ -0,0 +1,23 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+
+
+class StatementCounter:
+    """Counts SQL statements sent to the database inside a `with` block"""
+
+    def __init__(self):
+        self.statements = 0
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+
+
+@contextmanager
+def count_statements(bind):
+    """Count statements executed on `bind` (a Connection or Engine) while the block runs"""
+    counter = StatementCounter()
+    event.listen(bind, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(bind, "before_cursor_execute", counter._before_cursor_execute)
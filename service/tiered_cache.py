@@ -0,0 +1,288 @@
+from extensions import get_async_redis_client
+from service.cache_codec import CacheCodec, CacheCodecError
+from collections import OrderedDict
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "weather:cache:invalidate"
+
+
+class LocalCache:
+    """In-process LRU cache with a TTL, bounded by entry count and total bytes.
+
+    Shared by every request thread in the worker, so all access goes
+    through a lock; operations are O(1) apart from evictions.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    def get(self, key: str):
+        return self.get_entry(key)[0]
+
+    def get_entry(self, key: str):
+        """Return (value, seconds left on the L2 copy when known) or (None, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None, None
+            value, expires_at, origin_expires_at = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                self._remove(key)
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None, None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value, (origin_expires_at - now if origin_expires_at is not None else None)
+
+    def set(self, key: str, value: bytes, ttl: float = None, origin_ttl: float = None):
+        """Store a value for min(ttl, self.ttl); origin_ttl is the TTL left on the L2 copy"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        now = time.monotonic()
+        origin_expires_at = now + origin_ttl if origin_ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, now + ttl, origin_expires_at)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        value = self._entries.pop(key)[0]
+        self._bytes -= len(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        return stats
+
+
+class TieredCache:
+    """L1 LocalCache per worker in front of Redis (L2).
+
+    Reads try L1 first and fill it from L2 hits. Writes go to both and
+    publish the key on INVALIDATION_CHANNEL so other workers drop their L1
+    copy instead of serving it until its TTL runs out. Values are stored in
+    L2 through `codec` (see service/cache_codec.py); L1 and callers only
+    ever see decoded bodies.
+    """
+
+    def __init__(self, redis_client, local: LocalCache = None, codec: CacheCodec = None):
+        self.redis_client = redis_client
+        self.local = local
+        self.codec = codec or CacheCodec("none")
+        self.worker_id = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._listener = None
+        self.l2_stats = {
+            'hits': 0,
+            'misses': 0,
+            'undecodable': 0
+        }
+
+    @classmethod
+    def from_env(cls, redis_client):
+        local = None
+        if os.getenv("WEATHER_L1_ENABLED", "1") not in ("0", "false", "False"):
+            local = LocalCache(
+                max_entries=int(os.getenv("WEATHER_L1_MAX_ENTRIES", "512")),
+                max_bytes=int(os.getenv("WEATHER_L1_MAX_BYTES", str(64 * 1024 * 1024))),
+                ttl=float(os.getenv("WEATHER_L1_TTL", "60"))
+            )
+        return cls(redis_client, local, CacheCodec.from_env())
+
+    def _count_l2(self, hits: int, misses: int):
+        with self._lock:
+            self.l2_stats['hits'] += hits
+            self.l2_stats['misses'] += misses
+
+    def _decode(self, value):
+        """Body for an L2 value; an entry this worker cannot decode counts as a miss"""
+        if value is None:
+            return None
+        try:
+            return self.codec.decode(value)
+        except CacheCodecError as e:
+            logger.warning("Cache entry could not be decoded: %s", e)
+            with self._lock:
+                self.l2_stats['undecodable'] += 1
+            return None
+
+    async def get(self, key: str):
+        if self.local is not None:
+            self._ensure_listener()
+            value = self.local.get(key)
+            if value is not None:
+                return value
+
+        value = self._decode(await self.redis_client.get(key))
+        self._count_l2(int(value is not None), int(value is None))
+        if value is not None and self.local is not None:
+            self.local.set(key, value)
+        return value
+
+    async def get_with_ttl(self, key: str):
+        """Return (value, seconds of TTL left in L2 or None if unknown)"""
+        if self.local is not None:
+            self._ensure_listener()
+            value, ttl_left = self.local.get_entry(key)
+            if value is not None:
+                return value, ttl_left
+
+        def get_and_ttl(pipe):
+            pipe.get(key)
+            pipe.pttl(key)
+
+        value, pttl = await self.redis_client.pipeline(get_and_ttl)
+        value = self._decode(value)
+        self._count_l2(int(value is not None), int(value is None))
+        ttl_left = pttl / 1000 if pttl is not None and pttl >= 0 else None
+        if value is not None and self.local is not None:
+            self.local.set(key, value, origin_ttl=ttl_left)
+        return value, ttl_left
+
+    async def mget_with_ttl(self, keys) -> list:
+        """(value, seconds of TTL left or None) per key; L1 misses are read from L2 in one round trip"""
+        entries = [self.local.get_entry(key) if self.local is not None else (None, None) for key in keys]
+        missing = [i for i, (value, _) in enumerate(entries) if value is None]
+        if missing:
+            if self.local is not None:
+                self._ensure_listener()
+
+            def get_and_ttl(pipe):
+                for i in missing:
+                    pipe.get(keys[i])
+                    pipe.pttl(keys[i])
+
+            fetched = await self.redis_client.pipeline(get_and_ttl)
+            hits = 0
+            for n, i in enumerate(missing):
+                value, pttl = self._decode(fetched[2 * n]), fetched[2 * n + 1]
+                if value is None:
+                    continue
+                hits += 1
+                ttl_left = pttl / 1000 if pttl is not None and pttl >= 0 else None
+                entries[i] = (value, ttl_left)
+                if self.local is not None:
+                    self.local.set(keys[i], value, origin_ttl=ttl_left)
+            self._count_l2(hits, len(missing) - hits)
+        return entries
+
+    async def set(self, key: str, value: bytes, ttl: int, also=None):
+        """Write to L2 and L1; `also(pipe)` can queue extra commands in the same round trip"""
+        await self.set_many({key: value}, ttl, also)
+
+    async def set_many(self, items: dict, ttl: int, also=None):
+        if self.local is not None:
+            self._ensure_listener()
+
+        encoded = {key: self.codec.encode(value) for key, value in items.items()}
+
+        def write(pipe):
+            for key, value in encoded.items():
+                pipe.set(key, value, ex=ttl)
+                if self.local is not None:
+                    pipe.publish(INVALIDATION_CHANNEL, f"{self.worker_id}:{key}")
+            if also is not None:
+                also(pipe)
+
+        await self.redis_client.pipeline(write)
+        if self.local is not None:
+            for key, value in items.items():
+                self.local.set(key, value, ttl, origin_ttl=ttl)
+
+    def invalidate(self, key: str):
+        if self.local is not None:
+            self.local.invalidate(key)
+
+    def _ensure_listener(self):
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = self.redis_client.background_loop.submit(self._listen())
+
+    async def _listen(self):
+        """Drop L1 entries that other workers have rewritten; runs on the background loop"""
+        while True:
+            pubsub = self.redis_client.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    data = message.get('data')
+                    if isinstance(data, bytes):
+                        data = data.decode("utf-8")
+                    origin, _, key = str(data).partition(":")
+                    if origin != self.worker_id:
+                        self.local.invalidate(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Cache invalidation listener error")
+                # Entries may have changed while disconnected; start clean
+                self.local.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.reset()
+
+    def stats(self) -> dict:
+        with self._lock:
+            l2 = dict(self.l2_stats)
+        return {
+            'l1': self.local.snapshot() if self.local is not None else None,
+            'l2': l2,
+            'codec': self.codec.snapshot()
+        }
+
+
+_weather_cache = None
+_weather_cache_lock = threading.Lock()
+
+def get_weather_cache():
+    """Get the process-wide tiered cache for weather bodies"""
+    global _weather_cache
+    if _weather_cache is None:
+        with _weather_cache_lock:
+            if _weather_cache is None:
+                _weather_cache = TieredCache.from_env(get_async_redis_client())
+    return _weather_cache
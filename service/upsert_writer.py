@@ -0,0 +1,164 @@
+from models.weather import Weather, CurrentConditions, Station, HourlyBlock
+from service.bulk_writer import BulkWeatherWriter, SaveStats, build_rows, hourly_block_rows
+from service.statement_counter import count_statements
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+import hashlib
+import time
+import uuid
+
+# Namespace for ids derived from natural keys; changing it orphans stored rows
+NATURAL_ID_NAMESPACE = uuid.UUID("00eec76a-e438-4651-a3e5-422445a7483d")
+
+DIALECT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+
+def natural_id(scope: str, name: str) -> str:
+    """Stable id for a natural key: the same location, day or hour always maps to the same row"""
+    return str(uuid.uuid5(NATURAL_ID_NAMESPACE, f"{scope}/{name}"))
+
+
+def row_hash(row: dict) -> str:
+    """Digest of a row's values, compared in SQL to skip rows that did not change"""
+    values = repr(sorted((key, value) for key, value in row.items() if key != 'row_hash'))
+    return hashlib.blake2b(values.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def natural_rows(weather_row, condition_rows, station_rows):
+    """Re-key build_rows() output by natural key instead of random ids.
+
+    The forecast is keyed by its location, the current conditions by a
+    single slot per location, days and hours by datetime_epoch and stations
+    by their station id, so refetching a location addresses the rows that
+    already exist for it.
+    """
+    location = weather_row['location_key'] or f"{weather_row['latitude']},{weather_row['longitude']}"
+    weather_id = natural_id("weather", location)
+
+    current_id = weather_row['current_conditions_id']
+    ids = {}
+    for row in condition_rows:
+        if row['id'] == current_id:
+            name = "current"
+        elif row['parent_id']:
+            name = f"hour:{row['datetime_epoch']}"
+        else:
+            name = f"day:{row['datetime_epoch']}"
+        ids[row['id']] = natural_id(weather_id, name)
+
+    # A repeated epoch maps to one row; the last occurrence wins, as it would in the table
+    conditions = {}
+    for row in condition_rows:
+        row = {**row, 'id': ids[row['id']], 'parent_id': ids.get(row['parent_id']), 'weather_id': weather_id}
+        row['row_hash'] = row_hash(row)
+        conditions[row['id']] = row
+
+    stations = {}
+    for row in station_rows:
+        row = {**row, 'id': natural_id(weather_id, f"station:{row['station_id']}"), 'weather_id': weather_id}
+        row['row_hash'] = row_hash(row)
+        stations[row['id']] = row
+
+    weather_row = {**weather_row, 'id': weather_id, 'current_conditions_id': ids.get(current_id)}
+    return weather_row, list(conditions.values()), list(stations.values())
+
+
+class UpsertWeatherWriter(BulkWeatherWriter):
+    """Keeps one forecast tree per location and updates it in place.
+
+    Rows are keyed by natural keys (see natural_rows) and written with
+    INSERT ... ON CONFLICT (id) DO UPDATE. The update only fires when the
+    stored row_hash differs, so hours whose values did not change between
+    fetches cost nothing but their share of the statement. Days that drop
+    out of the forecast stay as history until the retention job prunes them.
+    """
+
+    def build(self, data: dict, location_key: str = None):
+        return natural_rows(*build_rows(data, location_key))
+
+    def write(self, written):
+        stats = SaveStats()
+        started = time.perf_counter()
+
+        weather_rows = []
+        condition_rows = []
+        block_rows = []
+        station_rows = []
+        for weather_row, conditions, stations in written:
+            weather_rows.append({**weather_row, 'current_conditions_id': None})
+            if self.hourly_storage == "compact":
+                condition_rows.extend(row for row in conditions if not row['parent_id'])
+                block_rows.extend(
+                    {**row, 'id': natural_id(row['day_id'], "hourly_block")}
+                    for row in hourly_block_rows(conditions)
+                )
+            else:
+                condition_rows.extend(conditions)
+            station_rows.extend(stations)
+
+        with count_statements(self.session.connection()) as counter:
+            # current_conditions_id is left out of the upsert: on insert it
+            # would reference a row that does not exist yet
+            stored_links = dict(self._upsert(
+                Weather, weather_rows, skip=('current_conditions_id',),
+                returning=(Weather.id, Weather.current_conditions_id)
+            ))
+            changed = 0
+            if condition_rows:
+                changed += len(self._upsert(CurrentConditions, condition_rows, changed_when='row_hash'))
+            if block_rows:
+                changed += len(self._upsert(HourlyBlock, block_rows, changed_when='data'))
+
+            # Current conditions ids are stable per location, so only newly
+            # inserted forecasts need linking
+            current_links = [
+                {'id': row['id'], 'current_conditions_id': row['current_conditions_id']}
+                for row, _, _ in written
+                if row['current_conditions_id'] and stored_links.get(row['id']) != row['current_conditions_id']
+            ]
+            if current_links:
+                self.session.execute(update(Weather), current_links)
+
+            if station_rows:
+                changed += len(self._upsert(Station, station_rows, changed_when='row_hash'))
+            # Stations are replaced as a set: drop the ones the payload no longer lists
+            self.session.execute(
+                delete(Station)
+                .where(
+                    Station.weather_id.in_([row['id'] for row in weather_rows]),
+                    Station.id.not_in([row['id'] for row in station_rows])
+                )
+                .execution_options(synchronize_session=False)
+            )
+            self.session.commit()
+
+        stats.statements = counter.statements
+        stats.rows = len(weather_rows) + changed
+        stats.unchanged = len(condition_rows) + len(block_rows) + len(station_rows) - changed
+        stats.elapsed_ms = (time.perf_counter() - started) * 1000
+        self.last_stats = stats
+        return written
+
+    def _upsert(self, model, rows, skip=(), changed_when=None, returning=None):
+        """INSERT ... ON CONFLICT (id) DO UPDATE for row dicts; returns the rows actually written.
+
+        With changed_when, a conflicting row is only updated when that column
+        differs from the stored value.
+        """
+        dialect = self.session.get_bind().dialect.name
+        if dialect not in DIALECT_INSERTS:
+            raise ValueError(f"Upsert persistence is not supported on {dialect}")
+
+        table = model.__table__
+        statement = DIALECT_INSERTS[dialect](model)
+        excluded = statement.excluded
+        columns = (set(rows[0]) | {'updated_at'}) - {'id', 'created_at', *skip}
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={name: excluded[name] for name in columns if name in table.c},
+            where=table.c[changed_when].is_distinct_from(excluded[changed_when]) if changed_when else None
+        ).returning(*(returning or (table.c.id,))).execution_options(render_nulls=True)
+        return self.session.execute(statement, rows).all()
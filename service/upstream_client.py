@@ -0,0 +1,170 @@
+from service.background_loop import get_background_loop
+import asyncio
+import os
+import random
+import threading
+import httpx
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class UpstreamClient:
+    """App-lifetime HTTP client for Visual Crossing calls.
+
+    A single httpx.AsyncClient with a bounded keep-alive pool lives on the
+    shared background loop, so connections (and TLS sessions) are reused
+    across requests. Calls are capped by a semaphore so bursts cannot exceed
+    the upstream quota, and 429/5xx responses or transport errors are retried
+    with full-jitter exponential backoff, honouring Retry-After when given.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.2,
+        backoff_max: float = 5.0,
+        max_concurrency: int = 10,
+        http2: bool = False,
+        transport=None
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self.http2 = http2
+        self.transport = transport
+        self.background_loop = get_background_loop()
+
+        # Only touched from the background loop
+        self._client = None
+        self._semaphore = None
+        self._stats = {
+            'requests': 0,
+            'retries': 0,
+            'failures': 0,
+            'in_flight': 0,
+            'waiting': 0,
+            'peak_in_flight': 0
+        }
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30")),
+            timeout=float(os.getenv("UPSTREAM_TIMEOUT", "10")),
+            connect_timeout=float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5")),
+            max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES", "3")),
+            backoff_base=float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.2")),
+            backoff_max=float(os.getenv("UPSTREAM_BACKOFF_MAX", "5")),
+            max_concurrency=int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "10")),
+            http2=os.getenv("UPSTREAM_HTTP2", "0") in ("1", "true", "True")
+        )
+
+    def _ensure_client(self):
+        if self._client is not None:
+            return
+        kwargs = {
+            'timeout': httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            'limits': httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            )
+        }
+        if self.http2:
+            # Needs the optional h2 package (pip install httpx[http2])
+            kwargs['http2'] = True
+        if self.transport is not None:
+            kwargs['transport'] = self.transport
+        self._client = httpx.AsyncClient(**kwargs)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """GET through the shared pool; safe to await from any request's event loop"""
+        return await self.background_loop.run(self._get(url, **kwargs))
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        self._ensure_client()
+        self._stats['waiting'] += 1
+        async with self._semaphore:
+            self._stats['waiting'] -= 1
+            self._stats['in_flight'] += 1
+            self._stats['peak_in_flight'] = max(self._stats['peak_in_flight'], self._stats['in_flight'])
+            try:
+                return await self._get_with_retries(url, **kwargs)
+            finally:
+                self._stats['in_flight'] -= 1
+
+    async def _get_with_retries(self, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            self._stats['requests'] += 1
+            try:
+                response = await self._client.get(url, **kwargs)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    self._stats['failures'] += 1
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    if response.status_code >= 400:
+                        self._stats['failures'] += 1
+                    return response
+                delay = self._retry_after(response) or self._backoff(attempt)
+
+            attempt += 1
+            self._stats['retries'] += 1
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_after(self, response: httpx.Response):
+        value = response.headers.get("Retry-After")
+        try:
+            return min(self.backoff_max, float(value)) if value else None
+        except ValueError:
+            return None
+
+    def stats(self) -> dict:
+        """Request counters plus connection pool utilization"""
+        stats = dict(self._stats)
+        stats['max_concurrency'] = self.max_concurrency
+        stats['max_connections'] = self.max_connections
+        # httpcore does not expose pool stats publicly, so read them defensively
+        pool = getattr(getattr(self._client, '_transport', None), '_pool', None)
+        connections = list(getattr(pool, 'connections', []) or [])
+        stats['connections'] = len(connections)
+        stats['idle_connections'] = sum(1 for conn in connections if conn.is_idle())
+        return stats
+
+    async def aclose(self):
+        if self._client is not None:
+            await self.background_loop.run(self._client.aclose())
+            self._client = None
+
+
+_upstream_client = None
+_upstream_client_lock = threading.Lock()
+
+def get_upstream_client():
+    """Get the process-wide upstream client, configured from the environment"""
+    global _upstream_client
+    if _upstream_client is None:
+        with _upstream_client_lock:
+            if _upstream_client is None:
+                _upstream_client = UpstreamClient.from_env()
+    return _upstream_client
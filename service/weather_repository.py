@@ -0,0 +1,84 @@
+from models.weather import Weather, CurrentConditions, Station, HourlyBlock
+from sqlalchemy import or_, select
+from sqlalchemy.orm.attributes import set_committed_value
+
+
+class WeatherRepository:
+    """Read access to stored forecasts.
+
+    `get_tree` loads a whole Weather with its current conditions, days,
+    hours and stations in a fixed number of queries however long the
+    timeline is, keeping only the days of the latest fetch: the weather row, every condition row for it, its stations,
+    and its hourly blocks when hours are stored in compact mode. The flat
+    condition rows are regrouped in Python and attached with
+    set_committed_value, so serializing the tree never lazy-loads.
+    """
+
+    # Most statements get_tree issues for a stored forecast
+    TREE_QUERIES = 4
+
+    def __init__(self, session):
+        self.session = session
+
+    def get_tree(self, weather_id: str):
+        weather = self.session.execute(
+            select(Weather).where(Weather.id == weather_id)
+        ).scalar_one_or_none()
+        if weather is None:
+            return None
+
+        condition_query = select(CurrentConditions).where(CurrentConditions.weather_id == weather_id)
+        if weather.first_day_epoch is not None:
+            # Days (and their hours) before the latest fetch are history kept by upsert mode
+            condition_query = condition_query.where(or_(
+                CurrentConditions.id == weather.current_conditions_id,
+                CurrentConditions.datetime_epoch >= weather.first_day_epoch
+            ))
+        conditions = self.session.execute(
+            condition_query.order_by(CurrentConditions.datetime_epoch)
+        ).scalars().all()
+        stations = self.session.execute(
+            select(Station).where(Station.weather_id == weather_id)
+        ).scalars().all()
+
+        by_id = {condition.id: condition for condition in conditions}
+        hours = {condition.id: [] for condition in conditions}
+        days = []
+        for condition in conditions:
+            if condition.parent_id:
+                # An hour can outlast its day when the day was left out as history
+                if condition.parent_id in hours:
+                    hours[condition.parent_id].append(condition)
+            elif condition.id != weather.current_conditions_id:
+                days.append(condition)
+
+        blocks = {}
+        if any(not hours[day.id] for day in days):
+            blocks = {
+                block.day_id: block
+                for block in self.session.execute(
+                    select(HourlyBlock).where(HourlyBlock.day_id.in_([day.id for day in days]))
+                ).scalars()
+            }
+
+        for condition in conditions:
+            set_committed_value(condition, 'hours', hours[condition.id])
+            set_committed_value(condition, 'hourly_block', blocks.get(condition.id))
+        set_committed_value(weather, 'days', days)
+        set_committed_value(weather, 'stations', stations)
+        set_committed_value(weather, 'current_conditions', by_id.get(weather.current_conditions_id))
+        return weather
+
+    def latest_id_for_location(self, location_key: str):
+        """Id of the most recently stored forecast for a spatial cell"""
+        # updated_at rather than created_at: upserted forecasts keep their row
+        return self.session.execute(
+            select(Weather.id)
+            .where(Weather.location_key == location_key)
+            .order_by(Weather.updated_at.desc())
+            .limit(1)
+        ).scalar()
+
+    def latest_for_location(self, location_key: str):
+        weather_id = self.latest_id_for_location(location_key)
+        return self.get_tree(weather_id) if weather_id else None
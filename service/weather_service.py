@@ -1,211 +1,507 @@
-from models.weather import Weather, CurrentConditions, Station
-from extensions import db, get_redis_client
-from dotenv import load_dotenv
+from service.bulk_writer import BulkWeatherWriter
+from service.upsert_writer import UpsertWeatherWriter
+from service.single_flight import SingleFlight
+from service.geo_keys import SpatialKeyScheme
+from service.upstream_client import get_upstream_client
+from extensions import db, get_async_redis_client
+from service.weather_repository import WeatherRepository
+from service.tiered_cache import get_weather_cache
+from service.write_behind import get_write_queue, write_behind_enabled
+from service.refresh import RefreshScheduler
+from service.metrics import metrics
+from models.serialization import dumps, loads, project_weather, weather_dict_from_rows
+from flask import current_app, has_app_context
 import os
-import httpx
-import json
 import asyncio
+import logging
+import uuid
 
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Cached values are encoded response bodies, not raw Visual Crossing payloads;
+# the versioned prefix keeps old-format entries from being served as bodies
+CACHE_KEY_PREFIX = "weather:v2"
+
+# Entries live for the hard TTL; once older than the soft TTL they are still
+# served, but a background refresh replaces them (stale-while-revalidate)
+CACHE_HARD_TTL = int(os.getenv("WEATHER_CACHE_HARD_TTL", "86400"))
+CACHE_SOFT_TTL = int(os.getenv("WEATHER_CACHE_SOFT_TTL", "3600"))
+
+# "snapshot" stores a new forecast tree per fetch; "upsert" keeps one tree per
+# location and only writes the rows whose values changed
+PERSISTENCE_WRITERS = {
+    "snapshot": BulkWeatherWriter,
+    "upsert": UpsertWeatherWriter
+}
+
+# How long a stream request waits for a queued write to reach the DB
+STORED_WAIT_SECONDS = float(os.getenv("WEATHER_STORED_WAIT_SECONDS", "5"))
+
+# Upstream fetches a single batch request may have in flight at once
+BATCH_FETCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_FETCH_CONCURRENCY", "8"))
+
+# Cross-worker fill lock: the holder fetches upstream while other workers
+# poll the cache. The lease bounds how long a crashed holder blocks a key.
+FILL_LOCK_LEASE_MS = int(os.getenv("WEATHER_FILL_LOCK_LEASE_MS", "10000"))
+FILL_LOCK_POLL_SECONDS = float(os.getenv("WEATHER_FILL_LOCK_POLL_SECONDS", "0.05"))
+
+# Compare-and-delete so a holder whose lease expired cannot drop a lock
+# that another worker has since acquired
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def encode_body(result: dict) -> bytes:
+    """Encode a to_dict() result exactly as it is cached and served"""
+    return dumps(result)
+
+
+def project_body(body: bytes, fields) -> bytes:
+    """Re-encode a cached body keeping only `fields` in its condition records"""
+    if not fields:
+        return body
+    return dumps(project_weather(loads(body), fields))
+
+
+def is_stale(ttl_left, soft_ttl: float = CACHE_SOFT_TTL) -> bool:
+    """Whether an entry with ttl_left seconds to live is older than soft_ttl (default: the soft TTL)"""
+    return ttl_left is not None and CACHE_HARD_TTL - ttl_left >= soft_ttl
+
+
+def init_write_behind(app):
+    """Start each worker's write-behind consumer with its first request.
+
+    Every worker drains the queue, not only those that have had a miss:
+    entries may have been queued by a worker that has since died, or by
+    `flask prefetch-weather --once`.
+    """
+    if not write_behind_enabled():
+        return
+
+    @app.before_request
+    def ensure_write_consumer():
+        write_queue = get_write_queue()
+        if not write_queue.consumer_started:
+            write_queue.ensure_consumer(app, WeatherService(get_async_redis_client())._write_rows)
 
 
 class WeatherService:
-    def __init__(self, redis_client):
+    # Shared by every request in this worker process
+    single_flight = SingleFlight()
+    key_scheme = SpatialKeyScheme.from_env()
+    refresher = RefreshScheduler.from_env()
+
+    def __init__(self, redis_client, upstream=None, cache=None):
         self.db = db
+        # Background refreshes run outside the request and need the app to reach the DB
+        self.app = current_app._get_current_object() if has_app_context() else None
         self.redis_client = redis_client
+        self.cache = cache or get_weather_cache()
+        self.upstream = upstream or get_upstream_client()
         self.weather_url = os.getenv("WEATHER_API_URL")
         self.weather_key = os.getenv("WEATHER_API_KEY")
+        self.last_save_stats = None
+        # queryCost reported by every upstream fetch this service made
+        self.query_cost = 0
+        persistence = os.getenv("WEATHER_PERSISTENCE", "snapshot")
+        if persistence not in PERSISTENCE_WRITERS:
+            raise ValueError(f"Unknown persistence mode: {persistence}")
+        self.writer_class = PERSISTENCE_WRITERS[persistence]
+        self.write_queue = get_write_queue()
 
     class WeatherException(Exception):
         pass
 
     @classmethod
     async def create(cls):
-        redis_client = get_redis_client()
-        return cls(redis_client)
-
-    def _save_weather_to_db(self, data):
-        """Synchronous method to save weather data to database"""
-        try:
-            weather = Weather(
-                query_cost=data.get('queryCost'),
-                latitude=data.get('latitude'),
-                longitude=data.get('longitude'),
-                resolved_address=data.get('resolvedAddress'),
-                address=data.get('address'),
-                timezone=data.get('timezone'),
-                tzoffset=data.get('tzoffset'),
-                description=data.get('description'),
-                alerts=data.get('alerts')
-            )
+        # Clients are process-wide; creating a service builds no connections
+        return cls(get_async_redis_client())
 
-            self.db.session.add(weather)
-            self.db.session.flush()  # Get the weather.id
-
-            # Create CurrentConditions for current weather
-            if data.get('currentConditions'):
-                current = data['currentConditions']
-                current_conditions = self._create_current_condition(current, weather.id, None)
-                self.db.session.add(current_conditions)
-                self.db.session.flush()
-                weather.current_conditions_id = current_conditions.id
-
-            # Create CurrentConditions for days and hours
-            if data.get('days'):
-                for day_data in data['days']:
-                    day_condition = self._create_current_condition(day_data, weather.id, None)
-                    self.db.session.add(day_condition)
-                    self.db.session.flush()
-
-                    # Create hourly conditions for this day
-                    if day_data.get('hours'):
-                        for hour_data in day_data['hours']:
-                            hour_condition = self._create_current_condition(hour_data, weather.id, day_condition.id)
-                            self.db.session.add(hour_condition)
-
-            # Create Station objects
-            if data.get('stations'):
-                for station_key, station_data in data['stations'].items():
-                    station = Station(
-                        distance=station_data.get('distance'),
-                        latitude=station_data.get('latitude'),
-                        longitude=station_data.get('longitude'),
-                        use_count=station_data.get('useCount'),
-                        station_id=station_key,
-                        name=station_data.get('name'),
-                        quality=station_data.get('quality'),
-                        contribution=station_data.get('contribution'),
-                        weather_id=weather.id
-                    )
-                    self.db.session.add(station)
-
-            # Commit to database
-            self.db.session.commit()
-
-            return weather
+    def _save_rows(self, items):
+        """Build and write the rows for (payload, location_key) pairs in one transaction; returns the rows"""
+        writer = self.writer_class(self.db.session)
+        with metrics.span("build_rows"):
+            written = [writer.build(data, location_key) for data, location_key in items]
+        self._write_rows(written)
+        return written
 
+    def _write_rows(self, written):
+        """Write built rows in one transaction; also the write-behind consumer's write function"""
+        writer = self.writer_class(self.db.session)
+        try:
+            with metrics.span("db_save"):
+                writer.write(written)
         except Exception as e:
             self.db.session.rollback()
             raise self.WeatherException(str(e))
 
-    async def get_weather_details_from_api(self, long : float, lat: float) -> Weather:
-        if not long:
-            raise self.WeatherException("longitude is missing")
+        self.last_save_stats = writer.last_stats
+        if logger.isEnabledFor(logging.DEBUG):
+            stats = writer.last_stats.to_dict()
+            logger.debug("Saved weather: %s rows (%s unchanged) in %s statements (%s ms)",
+                         stats['rows'], stats['unchanged'], stats['statements'], stats['elapsed_ms'])
 
-        if not lat:
-            raise self.WeatherException("latitude is missing")
+    async def _persist(self, items) -> list:
+        """Store (payload, location_key) pairs; returns the rows that are (or will be) stored.
+
+        Each item becomes a (weather_row, condition_rows, station_rows)
+        tuple, which responses are serialized from directly. With
+        write-behind on, the rows are queued without waiting for the DB.
+        When the queue is full the rows are written inline, which slows
+        callers down to the rate the DB can keep up with.
+        """
+        if self.write_queue is None or self.app is None:
+            return await asyncio.to_thread(self._save_rows, items)
 
+        self.write_queue.ensure_consumer(self.app, self._write_rows)
+        writer = self.writer_class(self.db.session)
+        with metrics.span("build_rows"):
+            written = [writer.build(data, location_key) for data, location_key in items]
+        inline = []
+        with metrics.span("enqueue"):
+            for rows in written:
+                if not await self.write_queue.enqueue(rows):
+                    inline.append(rows)
+        if inline:
+            await asyncio.to_thread(self._write_rows, inline)
+        return written
+
+    def _check_config(self):
         if not self.weather_key:
             raise self.WeatherException("api key is missing")
 
         if not self.weather_url:
             raise self.WeatherException("weather url is missing")
 
+    async def _fetch_timeline(self, lat: float, long: float) -> dict:
+        final_url = f"{self.weather_url}/rest/services/timeline/{lat}%2C{long}?unitGroup=us&key={self.weather_key}&contentType=json"
+        with metrics.span("upstream_fetch"):
+            response = await self.upstream.get(final_url)
+
+        if response.status_code != 200:
+            raise self.WeatherException(f"Weather cannot fetch, status code: {response.status_code}")
+
+        with metrics.span("json_decode"):
+            data = response.json()
+        metrics.add_query_cost(data.get("queryCost"))
+        self.query_cost += data.get("queryCost") or 0
+        return data
+
+    async def get_weather_details_from_api(self, long : float, lat: float, fields=None) -> bytes:
+        """Return the JSON-encoded weather body (Weather.to_dict() shape) for a coordinate.
+
+        The encoded body is what gets cached, so a hit hands back the stored
+        bytes untouched and is byte-identical to the miss that produced it.
+        With `fields` (see models.serialization.parse_fields) the condition
+        records are narrowed to those keys before returning.
+        """
+        if not long:
+            raise self.WeatherException("longitude is missing")
+
+        if not lat:
+            raise self.WeatherException("latitude is missing")
+
+        self._check_config()
+
         try:
-            cache_key = f"weather:{lat}:{long}"
-            # Use thread pool for synchronous Redis operations
-            cached_data = await asyncio.to_thread(self.redis_client.get, cache_key)
-
-            if cached_data:
-                # Return cached data directly without DB operations
-                data = json.loads(cached_data)
-                # Create a Weather object from cached data without saving to DB
-                weather = Weather(
-                    query_cost=data.get('queryCost'),
-                    latitude=data.get('latitude'),
-                    longitude=data.get('longitude'),
-                    resolved_address=data.get('resolvedAddress'),
-                    address=data.get('address'),
-                    timezone=data.get('timezone'),
-                    tzoffset=data.get('tzoffset'),
-                    description=data.get('description'),
-                    alerts=data.get('alerts')
-                )
-                return weather
+            location_key, query_lat, query_long = self.key_scheme.cell(lat, long)
+            cache_key = f"{CACHE_KEY_PREFIX}:{location_key}"
+            with metrics.span("cache_get"):
+                cached_body, ttl_left = await self.cache.get_with_ttl(cache_key)
+
+            if self.app is not None:
+                self.refresher.hot_keys.record(cache_key, location_key, query_lat, query_long)
+                self.refresher.ensure_started(self._rewarm)
+
+            if cached_body:
+                stale = is_stale(ttl_left)
+                metrics.count_cache("stale" if stale else "hit")
+                if stale and self.app is not None:
+                    self.refresher.record('stale_served')
+                    self.refresher.refresh_soon(
+                        cache_key,
+                        lambda: self._refresh(cache_key, location_key, query_lat, query_long)
+                    )
+                body = cached_body
             else:
-                final_url = f"{self.weather_url}/rest/services/timeline/{lat}%2C{long}?unitGroup=us&key={self.weather_key}&contentType=json"
-                async with httpx.AsyncClient() as client:
-                    response = await client.get(final_url)
-
-                if response.status_code == 200:
-                    data = response.json()
-                    # Use thread pool for synchronous Redis write
-                    await asyncio.to_thread(self.redis_client.setex, cache_key, 86400, json.dumps(data))
-                    # Only save to DB for fresh API calls
-                    weather = await asyncio.to_thread(self._save_weather_to_db, data)
-                    return weather
-                else:
-                    raise self.WeatherException(f"Weather cannot fetch, status code: {response.status_code}")
+                metrics.count_cache("miss")
+                body = await self.single_flight.do(
+                    cache_key,
+                    lambda: self._fill_cache(cache_key, location_key, query_lat, query_long)
+                )
+
+            if fields:
+                with metrics.span("project"):
+                    body = project_body(body, fields)
+            return body
 
         except Exception as e:
             raise self.WeatherException(str(e))
 
-    def _create_current_condition(self, data: dict, weather_id: str, parent_id: str = None):
-        """Helper method to create CurrentConditions object from data"""
-        from datetime import datetime
+    def _latest_weather_id(self, location_key: str):
+        return WeatherRepository(self.db.session).latest_id_for_location(location_key)
+
+    async def get_stored_weather_id(self, long: float, lat: float) -> str:
+        """Id of the latest stored forecast for a coordinate's cell, fetching it on a miss"""
+        location_key, _, _ = self.key_scheme.cell(lat, long)
+        weather_id = await asyncio.to_thread(self._latest_weather_id, location_key)
+        if weather_id is None:
+            await self.get_weather_details_from_api(long=long, lat=lat)
+            weather_id = await asyncio.to_thread(self._latest_weather_id, location_key)
+            # A write-behind write may still be queued
+            deadline = asyncio.get_running_loop().time() + STORED_WAIT_SECONDS
+            while weather_id is None and self.write_queue is not None and asyncio.get_running_loop().time() < deadline:
+                await asyncio.sleep(0.1)
+                weather_id = await asyncio.to_thread(self._latest_weather_id, location_key)
+        if weather_id is None:
+            raise self.WeatherException("weather is not stored for this location yet")
+        return weather_id
+
+    async def _refresh(self, cache_key: str, location_key: str, lat: float, long: float, min_age: float = None):
+        """Refetch a stale or hot key off the request path; returns the new body, or None if skipped"""
+        with self.app.app_context():
+            return await self._fill_cache(cache_key, location_key, lat, long, refresh=True, min_age=min_age)
+
+    async def _rewarm(self, entries):
+        """Refresh the hottest keys that are missing or past the soft TTL"""
+        if not entries:
+            return
+
+        def ttls(pipe):
+            for cache_key, _, _, _ in entries:
+                pipe.pttl(cache_key)
+
+        pttls = await self.redis_client.pipeline(ttls)
+        for (cache_key, location_key, lat, long), pttl in zip(entries, pttls):
+            ttl_left = pttl / 1000 if pttl is not None and pttl >= 0 else None
+            if pttl == -2 or is_stale(ttl_left):
+                self.refresher.refresh_soon(
+                    cache_key,
+                    lambda cache_key=cache_key, location_key=location_key, lat=lat, long=long:
+                        self._refresh(cache_key, location_key, lat, long)
+                )
+
+    async def _fill_cache(self, cache_key: str, location_key: str, lat: float, long: float,
+                          refresh: bool = False, min_age: float = None) -> bytes:
+        """Fetch, persist and cache a miss while holding the cross-worker fill lock.
+
+        With refresh=True the cache already holds a usable body: give up if
+        another worker holds the lock, and skip the fetch if the entry turns
+        out to be younger than min_age seconds (default: the soft TTL) once
+        the lock is ours.
+        """
+        lock_key = f"lock:{cache_key}"
+        token = uuid.uuid4().hex
+        deadline = asyncio.get_running_loop().time() + FILL_LOCK_LEASE_MS / 1000
+        acquired = False
+
+        while True:
+            acquired = await self.redis_client.set(lock_key, token, nx=True, px=FILL_LOCK_LEASE_MS)
+            if acquired:
+                break
+            if refresh:
+                return None
+            # Another worker is fetching this key; wait for it to fill the cache
+            await asyncio.sleep(FILL_LOCK_POLL_SECONDS)
+            cached_body = await self.cache.get(cache_key)
+            if cached_body:
+                self.single_flight.record('remote_coalesced')
+                return cached_body
+            if asyncio.get_running_loop().time() >= deadline:
+                # Holder looks stuck; fetch ourselves rather than fail the request
+                break
+
+        try:
+            if acquired and refresh:
+                ttl_left = await self.redis_client.pttl(cache_key)
+                if ttl_left >= 0 and not is_stale(ttl_left / 1000, CACHE_SOFT_TTL if min_age is None else min_age):
+                    return None
+            elif acquired:
+                # The previous holder may have filled the cache just before we got the lock
+                cached_body = await self.cache.get(cache_key)
+                if cached_body:
+                    self.single_flight.record('remote_coalesced')
+                    return cached_body
+
+            data = await self._fetch_timeline(lat, long)
+            # Only save to DB for fresh API calls
+            rows = (await self._persist([(data, location_key)]))[0]
+            with metrics.span("to_dict"):
+                result = weather_dict_from_rows(*rows)
+            with metrics.span("encode"):
+                body = encode_body(result)
+            if acquired:
+                # Store the body and drop our lock in one round trip
+                def unlock(pipe):
+                    pipe.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+                await self.cache.set(cache_key, body, CACHE_HARD_TTL, also=unlock)
+                acquired = False
+            else:
+                await self.cache.set(cache_key, body, CACHE_HARD_TTL)
+            return body
+        finally:
+            if acquired:
+                await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+
+    async def _fill_cache_many(self, cells) -> dict:
+        """_fill_cache for several keys: {cache_key: (location_key, lat, long)} -> {cache_key: body or exception}.
+
+        Fill locks for all keys are taken in one round trip. Keys whose lock
+        is ours are fetched concurrently, persisted in one transaction (or
+        queued) and cached, unlocking them, in one pipeline; keys another
+        worker is filling are waited for as a single miss would.
+        """
+        tokens = {cache_key: uuid.uuid4().hex for cache_key in cells}
+
+        def lock(pipe):
+            for cache_key, token in tokens.items():
+                pipe.set(f"lock:{cache_key}", token, nx=True, px=FILL_LOCK_LEASE_MS)
 
-        # Parse datetime
-        datetime_str = data.get('datetime')
-        datetime_epoch = data.get('datetimeEpoch')
+        locked = await self.redis_client.pipeline(lock)
+        held = [cache_key for cache_key, acquired in zip(cells, locked) if acquired]
+        contended = [cache_key for cache_key in cells if cache_key not in held]
 
-        if datetime_epoch:
-            current_datetime = datetime.fromtimestamp(datetime_epoch)
-        elif datetime_str:
+        async def fill_held():
+            results = {}
+            unlocked = set()
             try:
-                current_datetime = datetime.fromisoformat(datetime_str)
-            except:
-                current_datetime = datetime.now()
-        else:
-            current_datetime = datetime.now()
-
-        return CurrentConditions(
-            current_conditions_datetime=current_datetime,
-            datetime_epoch=datetime_epoch or 0,
-            temp=data.get('temp', 0.0),
-            feelslike=data.get('feelslike', 0.0),
-            humidity=data.get('humidity', 0.0),
-            dew=data.get('dew', 0.0),
-            precip=data.get('precip'),  # Can be None/null
-            precipprob=data.get('precipprob', 0.0),
-            snow=data.get('snow', 0.0),  # Changed to Float
-            snowdepth=data.get('snowdepth', 0.0),  # Changed to Float
-            preciptype=','.join(data.get('preciptype', [])) if data.get('preciptype') else None,
-            windgust=data.get('windgust'),
-            windspeed=data.get('windspeed', 0.0),
-            winddir=data.get('winddir', 0.0),
-            pressure=data.get('pressure', 0.0),
-            visibility=data.get('visibility', 0.0),
-            cloudcover=data.get('cloudcover', 0.0),
-            solarradiation=data.get('solarradiation', 0.0),
-            solarenergy=data.get('solarenergy', 0.0),
-            uvindex=data.get('uvindex', 0),
-            conditions=data.get('conditions', ''),
-            icon=data.get('icon', ''),
-            stations=data.get('stations'),
-            source=data.get('source', ''),
-            sunrise=self._parse_time_to_datetime(data.get('sunrise')) if data.get('sunrise') else None,
-            sunrise_epoch=data.get('sunriseEpoch'),
-            sunset=self._parse_time_to_datetime(data.get('sunset')) if data.get('sunset') else None,
-            sunset_epoch=data.get('sunsetEpoch'),
-            moonphase=data.get('moonphase'),
-            tempmax=data.get('tempmax'),
-            tempmin=data.get('tempmin'),
-            feelslikemax=data.get('feelslikemax'),
-            feelslikemin=data.get('feelslikemin'),
-            precipcover=data.get('precipcover'),
-            severerisk=data.get('severerisk'),
-            description=data.get('description'),
-            weather_id=weather_id,
-            parent_id=parent_id
+                # Previous holders may have filled some keys just before we got their locks
+                cached = await self.cache.mget_with_ttl(held) if held else []
+                for cache_key, (body, _) in zip(held, cached):
+                    if body:
+                        self.single_flight.record('remote_coalesced')
+                        results[cache_key] = body
+                misses = [cache_key for cache_key in held if cache_key not in results]
+
+                semaphore = asyncio.Semaphore(BATCH_FETCH_CONCURRENCY)
+
+                async def fetch(cache_key):
+                    _, query_lat, query_long = cells[cache_key]
+                    async with semaphore:
+                        return await self._fetch_timeline(query_lat, query_long)
+
+                fetched = []
+                outcomes = await asyncio.gather(*[fetch(cache_key) for cache_key in misses], return_exceptions=True)
+                for cache_key, result in zip(misses, outcomes):
+                    if isinstance(result, Exception):
+                        results[cache_key] = result
+                    else:
+                        fetched.append((cache_key, result))
+                if not fetched:
+                    return results
+
+                try:
+                    written = await self._persist([(data, cells[cache_key][0]) for cache_key, data in fetched])
+                except self.WeatherException as e:
+                    results.update((cache_key, e) for cache_key, _ in fetched)
+                    return results
+
+                with metrics.span("to_dict"):
+                    dicts = [weather_dict_from_rows(*rows) for rows in written]
+                with metrics.span("encode"):
+                    new_bodies = {cache_key: encode_body(result) for (cache_key, _), result in zip(fetched, dicts)}
+
+                # Store the bodies and drop their locks in one round trip
+                def unlock(pipe):
+                    for cache_key in new_bodies:
+                        pipe.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{cache_key}", tokens[cache_key])
+
+                await self.cache.set_many(new_bodies, CACHE_HARD_TTL, also=unlock)
+                unlocked.update(new_bodies)
+                results.update(new_bodies)
+                return results
+            finally:
+                unreleased = [cache_key for cache_key in held if cache_key not in unlocked]
+                if unreleased:
+                    def release(pipe):
+                        for cache_key in unreleased:
+                            pipe.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{cache_key}", tokens[cache_key])
+
+                    await self.redis_client.pipeline(release)
+
+        held_results, contended_results = await asyncio.gather(
+            fill_held(),
+            asyncio.gather(*[self._fill_cache(cache_key, *cells[cache_key]) for cache_key in contended], return_exceptions=True)
         )
+        return {**held_results, **dict(zip(contended, contended_results))}
 
-    def _parse_time_to_datetime(self, time_str: str):
-        """Parse time string to datetime object"""
-        from datetime import datetime
-        try:
-            return datetime.strptime(time_str, "%H:%M:%S")
-        except:
-            return None
+    async def get_weather_batch(self, coordinates, fields=None) -> list:
+        """Resolve many (lat, long) pairs; returns a (body, error) pair per input, in input order.
+
+        Coordinates falling in the same cell are resolved once. All cache hits
+        come from a single round trip, and stale hits are refreshed in the
+        background as on the single lookup. Misses are coalesced with
+        concurrent lookups of the same keys, in this worker and across
+        workers, then fetched concurrently and persisted in one transaction
+        (or queued, with write-behind on) before being cached. `fields`
+        narrows each body as in get_weather_details_from_api.
+        """
+        self._check_config()
+
+        item_keys = []
+        cells = {}
+        errors = {}
+        for lat, long in coordinates:
+            if not lat or not long:
+                item_keys.append(None)
+                continue
+            location_key, query_lat, query_long = self.key_scheme.cell(lat, long)
+            cache_key = f"{CACHE_KEY_PREFIX}:{location_key}"
+            cells.setdefault(cache_key, (location_key, query_lat, query_long))
+            item_keys.append(cache_key)
+
+        bodies = {}
+        if cells:
+            cache_keys = list(cells)
+            with metrics.span("cache_get"):
+                cached = await self.cache.mget_with_ttl(cache_keys)
+
+            if self.app is not None:
+                for cache_key, cell in cells.items():
+                    self.refresher.hot_keys.record(cache_key, *cell)
+                self.refresher.ensure_started(self._rewarm)
+
+            stale = 0
+            for cache_key, (body, ttl_left) in zip(cache_keys, cached):
+                if not body:
+                    continue
+                bodies[cache_key] = body
+                if is_stale(ttl_left):
+                    stale += 1
+                    if self.app is not None:
+                        self.refresher.record('stale_served')
+                        self.refresher.refresh_soon(
+                            cache_key,
+                            lambda cache_key=cache_key: self._refresh(cache_key, *cells[cache_key])
+                        )
+            if metrics.enabled:
+                metrics.cache_requests.inc(("hit",), len(bodies) - stale)
+                metrics.cache_requests.inc(("stale",), stale)
+                metrics.cache_requests.inc(("miss",), len(cache_keys) - len(bodies))
+
+        misses = {cache_key: cell for cache_key, cell in cells.items() if cache_key not in bodies}
+        if misses:
+            filled = await self.single_flight.do_many(
+                list(misses),
+                lambda led: self._fill_cache_many({cache_key: misses[cache_key] for cache_key in led})
+            )
+            for cache_key, outcome in filled.items():
+                if isinstance(outcome, Exception):
+                    errors[cache_key] = str(outcome)
+                else:
+                    bodies[cache_key] = outcome
 
+        if fields:
+            with metrics.span("project"):
+                bodies = {key: project_body(body, fields) for key, body in bodies.items()}
 
+        return [
+            (bodies.get(key), errors.get(key)) if key else (None, "latitude or longitiude is missing")
+            for key in item_keys
+        ]
@@ -0,0 +1,123 @@
+from models.weather import Weather, CurrentConditions, Station, HourlyBlock
+from extensions import db
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from models.serialization import dumps
+
+STREAM_MODES = ("ndjson", "json")
+
+# Rows fetched per round trip from the server-side cursor
+STREAM_BATCH_SIZE = 200
+
+
+def _encode(value) -> bytes:
+    return dumps(value)
+
+
+def _iter_days_with_hours(weather: Weather):
+    """Yield (day, hour dicts iterator) for each stored day, in date order.
+
+    Days are few and loaded up front; hours are read through a server-side
+    cursor (yield_per) ordered by their day, so only a batch of hour rows is
+    in memory at a time. Days whose hours are stored as a compact hourly
+    block are decoded one block at a time.
+    """
+    day_query = select(CurrentConditions).where(
+        CurrentConditions.weather_id == weather.id,
+        CurrentConditions.parent_id.is_(None)
+    )
+    if weather.current_conditions_id:
+        day_query = day_query.where(CurrentConditions.id != weather.current_conditions_id)
+    if weather.first_day_epoch is not None:
+        # Days before the latest fetch are history kept by upsert mode
+        day_query = day_query.where(CurrentConditions.datetime_epoch >= weather.first_day_epoch)
+    days = db.session.execute(
+        day_query.order_by(CurrentConditions.datetime_epoch, CurrentConditions.id)
+    ).scalars().all()
+
+    day = aliased(CurrentConditions)
+    hour_query = select(CurrentConditions).join(day, CurrentConditions.parent_id == day.id).where(
+        CurrentConditions.weather_id == weather.id
+    )
+    if weather.first_day_epoch is not None:
+        hour_query = hour_query.where(day.datetime_epoch >= weather.first_day_epoch)
+    hours = db.session.execute(
+        hour_query
+        .order_by(day.datetime_epoch, day.id, CurrentConditions.datetime_epoch)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    ).scalars()
+
+    block_ids = dict(db.session.execute(
+        select(HourlyBlock.day_id, HourlyBlock.id).where(HourlyBlock.weather_id == weather.id)
+    ).all())
+
+    pending = next(hours, None)
+    for day_row in days:
+        def day_hours(day_id=day_row.id):
+            nonlocal pending
+            found = False
+            while pending is not None and pending.parent_id == day_id:
+                found = True
+                yield pending.to_dict()
+                pending = next(hours, None)
+            if not found and day_id in block_ids:
+                yield from db.session.get(HourlyBlock, block_ids[day_id]).decode_hours()
+
+        yield day_row, day_hours()
+    hours.close()
+
+
+def _stations(weather: Weather):
+    return db.session.execute(
+        select(Station).where(Station.weather_id == weather.id)
+    ).scalars().all()
+
+
+def stream_weather_ndjson(weather_id: str):
+    """Yield a stored forecast as NDJSON: one line per weather, station, day and hour"""
+    weather = db.session.get(Weather, weather_id)
+    yield _encode({"type": "weather", "data": weather.to_summary_dict()}) + b"\n"
+
+    if weather.current_conditions_id:
+        current = db.session.get(CurrentConditions, weather.current_conditions_id)
+        yield _encode({"type": "current_conditions", "data": current.to_dict()}) + b"\n"
+
+    for station in _stations(weather):
+        yield _encode({"type": "station", "data": station.to_dict()}) + b"\n"
+
+    for day, hours in _iter_days_with_hours(weather):
+        yield _encode({"type": "day", "data": day.to_dict()}) + b"\n"
+        for hour in hours:
+            yield _encode({"type": "hour", "day_id": day.id, "data": hour}) + b"\n"
+
+
+def stream_weather_json(weather_id: str):
+    """Yield a stored forecast as one JSON document shaped like the regular response, day by day"""
+    weather = db.session.get(Weather, weather_id)
+    current = None
+    if weather.current_conditions_id:
+        current = db.session.get(CurrentConditions, weather.current_conditions_id)
+
+    head = weather.to_summary_dict()
+    head['current_conditions'] = current.to_dict() if current else None
+    head['stations'] = [station.to_dict() for station in _stations(weather)]
+    # Leave the object open so days can follow
+    yield b'{"data":' + _encode(head)[:-1] + b',"days":['
+
+    first_day = True
+    for day, hours in _iter_days_with_hours(weather):
+        yield (b"" if first_day else b",") + _encode(day.to_dict())[:-1] + b',"hours":['
+        first_day = False
+        first_hour = True
+        for hour in hours:
+            yield (b"" if first_hour else b",") + _encode(hour)
+            first_hour = False
+        yield b"]}"
+
+    yield b']},"status":true}\n'
+
+
+def stream_weather(weather_id: str, mode: str):
+    if mode == "ndjson":
+        return stream_weather_ndjson(weather_id)
+    return stream_weather_json(weather_id)
@@ -0,0 +1,287 @@
+from extensions import get_async_redis_client
+from redis.exceptions import ResponseError
+from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Adds the entry only while the stream is below its limit, in one round trip
+ENQUEUE_SCRIPT = """
+if redis.call("XLEN", KEYS[1]) >= tonumber(ARGV[1]) then
+    return false
+end
+return redis.call("XADD", KEYS[1], "*", "rows", ARGV[2], "attempts", "0")
+"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    raise TypeError(f"Cannot queue value of type {type(value).__name__}")
+
+
+def _decode_object(obj):
+    if len(obj) == 1 and '$dt' in obj:
+        return datetime.fromisoformat(obj['$dt'])
+    return obj
+
+
+def encode_rows(written) -> bytes:
+    """Serialize one payload's (weather_row, condition_rows, station_rows) for the queue"""
+    return json.dumps(written, default=_encode_value, separators=(",", ":")).encode("utf-8")
+
+
+def decode_rows(blob: bytes):
+    weather_row, condition_rows, station_rows = json.loads(blob, object_hook=_decode_object)
+    return weather_row, condition_rows, station_rows
+
+
+def _entry_age_ms(entry_id) -> float:
+    """Milliseconds since a stream entry was added, read from its auto-generated id"""
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode("ascii")
+    return time.time() * 1000 - int(entry_id.split("-")[0])
+
+
+class WriteBehindQueue:
+    """Durable queue of pending DB writes on a Redis stream.
+
+    Request code enqueues the rows it would have written and returns;
+    a consumer on the background loop of every worker reads them through a
+    consumer group and writes them in batches. Each entry is acknowledged
+    and deleted once its batch commits, so the stream length is the backlog.
+
+    - backpressure: enqueue() refuses entries once the backlog reaches
+      max_depth, and the caller writes synchronously instead
+    - retries: a failed batch is retried one entry at a time; an entry that
+      keeps failing is re-queued with its attempt count until max_attempts,
+      then moved to the dead-letter stream; an entry that cannot be decoded
+      is moved there straight away
+    - recovery: entries left pending by a worker that died are claimed by
+      another consumer once they have been idle for claim_idle_ms
+    """
+
+    def __init__(self, redis_client, stream: str = "weather:writes", group: str = "weather-writers",
+                 max_depth: int = 10000, batch_size: int = 50, block_ms: int = 1000,
+                 max_attempts: int = 5, claim_idle_ms: int = 60000):
+        self.redis_client = redis_client
+        self.stream = stream
+        self.dead_letter_stream = f"{stream}:dead"
+        self.group = group
+        self.consumer = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.max_attempts = max_attempts
+        self.claim_idle_ms = claim_idle_ms
+        self._lock = threading.Lock()
+        self._consumer_task = None
+        self.stats = {
+            'enqueued': 0,
+            'rejected': 0,
+            'written': 0,
+            'batches': 0,
+            'retries': 0,
+            'dead_lettered': 0,
+            'claimed': 0,
+            'last_batch_ms': 0.0
+        }
+
+    @classmethod
+    def from_env(cls, redis_client):
+        return cls(
+            redis_client,
+            stream=os.getenv("WEATHER_WRITE_QUEUE_STREAM", "weather:writes"),
+            max_depth=int(os.getenv("WEATHER_WRITE_QUEUE_MAX_DEPTH", "10000")),
+            batch_size=int(os.getenv("WEATHER_WRITE_BATCH_SIZE", "50")),
+            max_attempts=int(os.getenv("WEATHER_WRITE_MAX_ATTEMPTS", "5")),
+            claim_idle_ms=int(os.getenv("WEATHER_WRITE_CLAIM_IDLE_MS", "60000"))
+        )
+
+    def record(self, counter: str, amount=1):
+        with self._lock:
+            self.stats[counter] += amount
+
+    async def enqueue(self, written) -> bool:
+        """Queue one payload's rows; False when the backlog is full and the caller must write itself"""
+        entry_id = await self.redis_client.eval(
+            ENQUEUE_SCRIPT, 1, self.stream, self.max_depth, encode_rows(written)
+        )
+        self.record('enqueued' if entry_id else 'rejected')
+        return bool(entry_id)
+
+    @property
+    def consumer_started(self) -> bool:
+        return self._consumer_task is not None
+
+    def ensure_consumer(self, app, write):
+        """Start this worker's consumer once; `write(list of rows)` runs in a thread inside an app context"""
+        if self._consumer_task is not None:
+            return
+        with self._lock:
+            if self._consumer_task is None:
+                self._consumer_task = self.redis_client.background_loop.submit(self._consume(app, write))
+
+    async def _ensure_group(self):
+        try:
+            await self.redis_client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _consume(self, app, write):
+        failures = 0
+        last_claim = 0.0
+        while True:
+            try:
+                await self._ensure_group()
+                while True:
+                    entries = []
+                    if time.monotonic() - last_claim >= self.claim_idle_ms / 1000:
+                        last_claim = time.monotonic()
+                        _, entries, _ = await self.redis_client.xautoclaim(
+                            self.stream, self.group, self.consumer,
+                            min_idle_time=self.claim_idle_ms, start_id="0-0", count=self.batch_size
+                        )
+                        self.record('claimed', len(entries))
+                    if not entries:
+                        response = await self.redis_client.xreadgroup(
+                            self.group, self.consumer, {self.stream: ">"},
+                            count=self.batch_size, block=self.block_ms
+                        )
+                        entries = response[0][1] if response else []
+                    if not entries:
+                        continue
+
+                    if await self._write_batch(app, write, entries):
+                        failures = 0
+                    else:
+                        # Likely a DB outage rather than bad entries; back off before the next batch
+                        failures += 1
+                        await asyncio.sleep(min(30.0, 0.5 * 2 ** failures))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Write-behind consumer error")
+                await asyncio.sleep(1)
+
+    async def _write_batch(self, app, write, entries) -> bool:
+        """Write entries in one transaction, falling back to one at a time; True unless a write failed"""
+        started = time.perf_counter()
+        decoded = []
+        for entry_id, fields in entries:
+            try:
+                decoded.append((entry_id, fields, decode_rows(fields[b'rows'])))
+            except Exception as e:
+                # Retrying cannot fix an entry that does not decode
+                await self._retry_or_dead_letter(entry_id, fields, f"Undecodable entry: {e!r}", retry=False)
+        if not decoded:
+            return True
+        entries = [(entry_id, fields) for entry_id, fields, _ in decoded]
+        rows = [entry_rows for _, _, entry_rows in decoded]
+
+        try:
+            await self._run_write(app, write, rows)
+        except Exception:
+            logger.exception("Write-behind batch of %d failed, retrying one by one", len(entries))
+        else:
+            await self._ack([entry_id for entry_id, _ in entries])
+            self.record('written', len(entries))
+            self.record('batches')
+            with self._lock:
+                self.stats['last_batch_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            return True
+
+        all_written = True
+        for (entry_id, fields), entry_rows in zip(entries, rows):
+            try:
+                await self._run_write(app, write, [entry_rows])
+            except Exception as e:
+                all_written = False
+                await self._retry_or_dead_letter(entry_id, fields, str(e))
+            else:
+                await self._ack([entry_id])
+                self.record('written')
+        return all_written
+
+    async def _run_write(self, app, write, rows):
+        with app.app_context():
+            await asyncio.to_thread(write, rows)
+
+    async def _ack(self, entry_ids):
+        def ack(pipe):
+            pipe.xack(self.stream, self.group, *entry_ids)
+            pipe.xdel(self.stream, *entry_ids)
+
+        await self.redis_client.pipeline(ack)
+
+    async def _retry_or_dead_letter(self, entry_id, fields, error: str, retry: bool = True):
+        try:
+            attempts = int(fields.get(b'attempts', b'0')) + 1
+        except ValueError:
+            attempts, retry = 1, False
+        dead = not retry or attempts >= self.max_attempts
+
+        def move(pipe):
+            if dead:
+                pipe.xadd(self.dead_letter_stream, {
+                    'rows': fields.get(b'rows', b''),
+                    'attempts': attempts,
+                    'error': error[:1000],
+                    'entry_id': entry_id
+                }, maxlen=self.max_depth, approximate=True)
+            else:
+                pipe.xadd(self.stream, {'rows': fields[b'rows'], 'attempts': attempts})
+            pipe.xack(self.stream, self.group, entry_id)
+            pipe.xdel(self.stream, entry_id)
+
+        await self.redis_client.pipeline(move)
+        self.record('dead_lettered' if dead else 'retries')
+
+    async def metrics(self) -> dict:
+        """Queue depth, entries being written, age of the oldest entry and dead letters, plus counters"""
+        def read(pipe):
+            pipe.xlen(self.stream)
+            pipe.xrange(self.stream, "-", "+", count=1)
+            pipe.xlen(self.dead_letter_stream)
+
+        depth, oldest, dead_letters = await self.redis_client.pipeline(read)
+        try:
+            pending = (await self.redis_client.xpending(self.stream, self.group))['pending']
+        except ResponseError:
+            # Group not created yet: nothing has been consumed
+            pending = 0
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update({
+            'depth': depth,
+            'pending': pending,
+            'lag_ms': round(_entry_age_ms(oldest[0][0]), 3) if oldest else 0.0,
+            'dead_letters': dead_letters
+        })
+        return stats
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+def write_behind_enabled() -> bool:
+    return os.getenv("WEATHER_WRITE_BEHIND", "0") not in ("0", "false", "False")
+
+
+def get_write_queue():
+    """Get the process-wide write-behind queue, or None when WEATHER_WRITE_BEHIND is off"""
+    global _write_queue
+    if not write_behind_enabled():
+        return None
+    if _write_queue is None:
+        with _write_queue_lock:
+            if _write_queue is None:
+                _write_queue = WriteBehindQueue.from_env(get_async_redis_client())
+    return _write_queue
@@ -0,0 +1,52 @@
+"""Test configuration: settings are set and Redis is replaced by fakeredis before the app is imported."""
+import os
+
+os.environ.update({
+    "DATABASE_URL": "sqlite://",
+    "REDIS_URL": "redis://fakeredis",
+    "API_VERSION": "/api/v1",
+    "WEATHER_API_URL": "http://127.0.0.1:9",
+    "WEATHER_API_KEY": "test",
+})
+
+import fakeredis  # noqa: E402
+import fakeredis.aioredis  # noqa: E402
+import pytest  # noqa: E402
+import redis  # noqa: E402
+import redis.asyncio  # noqa: E402
+
+fake_server = fakeredis.FakeServer()
+redis.ConnectionPool.from_url = classmethod(
+    lambda cls, url, **kwargs: fakeredis.FakeRedis(
+        server=fake_server, decode_responses=kwargs.get("decode_responses", False)
+    ).connection_pool
+)
+redis.asyncio.BlockingConnectionPool.from_url = classmethod(
+    lambda cls, url, **kwargs: fakeredis.aioredis.FakeRedis(server=fake_server).connection_pool
+)
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'weather.db'}"
+
+
+@pytest.fixture
+def app(database_url):
+    """An app on a fresh SQLite database with the schema created"""
+    from app import create_app
+    from service.bootstrap import init_db
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url, "RATELIMIT_ENABLED": False})
+    with app.app_context():
+        init_db()
+    return app
+
+
+@pytest.fixture
+def session(app):
+    from extensions import db
+
+    with app.app_context():
+        yield db.session
+        db.session.remove()
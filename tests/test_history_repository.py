@@ -0,0 +1,16 @@
+from benchmarks.payloads import make_timeline
+from service.bulk_writer import BulkWeatherWriter
+from service.history_repository import HistoryRepository
+
+
+def test_nearest_location_skips_forecasts_without_a_location_key(session):
+    writer = BulkWeatherWriter(session)
+    # Stored before location keys existed, and closer to the query point
+    writer.save(make_timeline(lat=28.6139, long=77.209, days=1), None)
+    keyed, _, _ = writer.save(make_timeline(lat=28.63, long=77.22, days=1), "r3:28.630:77.220")
+
+    repository = HistoryRepository(session)
+    nearest = repository.nearest_location(28.6139, 77.209, 5)
+    assert nearest['weather_id'] == keyed['id']
+    assert nearest['location_key'] == "r3:28.630:77.220"
+    assert repository.nearest_location(28.6139, 77.209, 1) is None
@@ -0,0 +1,37 @@
+import pytest
+
+
+@pytest.mark.parametrize("query", ["end=inf", "start=1e400", "start=-inf", "end=nan", "end=not-a-date"])
+def test_invalid_epochs_are_rejected(app, query):
+    response = app.test_client().get(f"/api/v1/weather/history/hourly?latitude=28.6139&longitiude=77.209&{query}")
+    assert response.status_code == 200
+    assert response.get_json()["status"] is False
+
+
+def test_time_range_accepts_epochs_and_iso_dates(app):
+    response = app.test_client().get(
+        "/api/v1/weather/history/daily?latitude=28.6139&longitiude=77.209&start=2026-10-01&end=1791072000"
+    )
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["status"] is True
+    assert (body["data"]["start"], body["data"]["end"]) == (1790812800, 1791072000)
+    assert body["data"]["days"] == []
+
+
+@pytest.mark.parametrize("path", ["history/hourly", "history/daily", "nearest"])
+@pytest.mark.parametrize("coordinates", [
+    "latitude=inf&longitiude=1",
+    "latitude=1&longitiude=-inf",
+    "latitude=nan&longitiude=1",
+    "latitude=1e400&longitiude=1",
+    "latitude=90.5&longitiude=1",
+    "latitude=1&longitiude=-180.5",
+])
+@pytest.mark.parametrize("radius", ["", "&radius_km=5"])
+def test_invalid_coordinates_are_rejected(app, path, coordinates, radius):
+    response = app.test_client().get(f"/api/v1/weather/{path}?{coordinates}{radius}")
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["status"] is False
+    assert "latitude" in body["error"] or "longitiude" in body["error"]
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from benchmarks.payloads import make_timeline
+from models.hourly_codec import decode_hours, encode_hours
+from models.weather import Conditions, CurrentConditions, Icon
+from service.bulk_writer import BulkWeatherWriter, build_rows
+
+
+def _stored_hours(session, hour_rows):
+    """to_dict() of the hour rows after a round trip through the database"""
+    day_id = hour_rows[0]['parent_id']
+    session.expunge_all()
+    hours = session.execute(
+        select(CurrentConditions)
+        .where(CurrentConditions.parent_id == day_id)
+        .order_by(CurrentConditions.datetime_epoch)
+    ).scalars()
+    return [hour.to_dict() for hour in hours]
+
+
+def test_decoded_hours_match_to_dict(session):
+    weather_row, condition_rows, station_rows = build_rows(make_timeline(days=1), "cell:1")
+    hour_rows = [row for row in condition_rows if row['parent_id']]
+
+    unknown_conditions = "Rain, Freezing Drizzle/Freezing Rain"
+    unknown_icon = "hail"
+    assert unknown_conditions not in {member.value for member in Conditions}
+    assert unknown_icon not in {member.value for member in Icon}
+
+    hour_rows[0].update({
+        'precip': None, 'windgust': None, 'moonphase': None,
+        'sunrise': None, 'sunrise_epoch': None, 'sunset': None, 'sunset_epoch': None,
+        'conditions': unknown_conditions, 'icon': unknown_icon,
+        'stations': None, 'description': "Chuva fraca — São Paulo"
+    })
+    hour_rows[1].update({
+        'conditions': unknown_conditions, 'icon': Icon.CLOUDY.value,
+        'stations': ["KJFK", "KLGA"], 'preciptype': "rain,snow",
+        'current_conditions_datetime': datetime(2026, 10, 18, 1, 0, 0, 250000),
+        'sunrise': datetime(2026, 10, 18, 6, 31, 12), 'sunrise_epoch': 1792305072
+    })
+    hour_rows[2].update({'stations': ["KJFK", "KLGA"], 'uvindex': 0, 'temp': -0.5})
+
+    BulkWeatherWriter(session, "rows").write([(weather_row, condition_rows, station_rows)])
+
+    assert list(decode_hours(encode_hours(hour_rows))) == _stored_hours(session, hour_rows)
+
+
+def test_unknown_values_go_to_the_record_string_table():
+    _, condition_rows, _ = build_rows(make_timeline(days=1), "cell:1")
+    hour_rows = [row for row in condition_rows if row['parent_id']]
+    for row in hour_rows:
+        row['conditions'] = "Dust storm"
+
+    decoded = list(decode_hours(encode_hours(hour_rows)))
+
+    assert [hour['conditions'] for hour in decoded] == ["Dust storm"] * len(hour_rows)
+
+
+def test_rejects_unknown_version():
+    blob = bytearray(encode_hours([]))
+    blob[0] = 255
+    with pytest.raises(ValueError):
+        list(decode_hours(bytes(blob)))
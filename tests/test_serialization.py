@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+
+from models.serialization import JSON_BACKENDS, _load_backend
+
+
+def _backends():
+    backends = []
+    for name in JSON_BACKENDS:
+        try:
+            backends.append(_load_backend(name))
+        except ImportError:
+            continue
+    return backends
+
+
+RECORD = {
+    'resolved_address': "São Paulo, Brasil",
+    'description': "Chuva fraca — 15°C",
+    'datetime': datetime(2026, 10, 18, 6, 30),
+    'temp': 77.27584306856869,
+    'precip': 0.004,
+    'humidity': 64.5,
+    'uvindex': 7,
+    'snow': 0.0,
+    'preciptype': None,
+    'stations': ["VIDP", "remote"],
+}
+
+
+@pytest.mark.parametrize("name, dumps, loads", _backends(), ids=[backend[0] for backend in _backends()])
+def test_backends_write_the_same_bytes(name, dumps, loads):
+    _, reference_dumps, _ = _load_backend("json")
+    encoded = dumps(RECORD)
+    assert encoded == reference_dumps(RECORD)
+    assert "São Paulo".encode("utf-8") in encoded
+    assert loads(encoded)['datetime'] == "2026-10-18T06:30:00"
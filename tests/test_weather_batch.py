@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import httpx
+from sqlalchemy import func, select
+
+from benchmarks.payloads import make_timeline
+from extensions import db, get_async_redis_client
+from models.weather import Weather
+from service.single_flight import SingleFlight
+from service.tiered_cache import get_weather_cache
+from service.upstream_client import UpstreamClient
+from service.weather_service import CACHE_HARD_TTL, CACHE_SOFT_TTL, CACHE_KEY_PREFIX, WeatherService
+
+
+class StubUpstream:
+    """Visual Crossing stand-in that counts timeline fetches"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def handle(self, request):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return httpx.Response(200, json=make_timeline(days=2))
+
+    def client(self):
+        return UpstreamClient(transport=httpx.MockTransport(self.handle))
+
+
+def _service(upstream, worker_single_flight=None):
+    service = WeatherService(get_async_redis_client(), upstream=upstream)
+    if worker_single_flight is not None:
+        # Stands in for another worker process, which has its own flights
+        service.single_flight = worker_single_flight
+    return service
+
+
+def test_concurrent_batch_misses_fetch_and_store_once(app):
+    stub = StubUpstream(delay=0.2)
+    upstream = stub.client()
+    coordinates = [(40.7128, -74.006), (40.71281, -74.00601)]
+    flights = [None, None, SingleFlight(), SingleFlight()]
+    results = [None] * len(flights)
+    start = threading.Barrier(len(flights))
+
+    def request(i):
+        with app.app_context():
+            service = _service(upstream, flights[i])
+            start.wait()
+            results[i] = asyncio.run(service.get_weather_batch(coordinates))
+
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(len(flights))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    bodies = {body for result in results for body, error in result}
+    assert all(error is None for result in results for _, error in result)
+    assert len(bodies) == 1
+    assert stub.calls == 1
+    with app.app_context():
+        assert db.session.scalar(select(func.count()).select_from(Weather)) == 1
+
+
+def test_stale_batch_hit_is_served_and_refreshed(app):
+    stub = StubUpstream()
+    upstream = stub.client()
+    latitude, longitude = 35.6762, 139.6503
+    location_key, _, _ = WeatherService.key_scheme.cell(latitude, longitude)
+    cache_key = f"{CACHE_KEY_PREFIX}:{location_key}"
+    stale_body = b'{"stale":true}'
+    # Written longer than the soft TTL ago
+    asyncio.run(get_weather_cache().set(cache_key, stale_body, CACHE_HARD_TTL - CACHE_SOFT_TTL - 1))
+    get_weather_cache().invalidate(cache_key)
+    refreshes = WeatherService.refresher.stats['refreshes']
+
+    with app.app_context():
+        service = _service(upstream)
+        [(body, error)] = asyncio.run(service.get_weather_batch([(latitude, longitude)]))
+    assert (body, error) == (stale_body, None)
+    assert cache_key in [key for key, *_ in WeatherService.refresher.hot_keys.top(1000)]
+
+    deadline = time.monotonic() + 10
+    while WeatherService.refresher.stats['refreshes'] == refreshes:
+        assert time.monotonic() < deadline, "stale batch hit was not refreshed"
+        time.sleep(0.05)
+    assert stub.calls == 1
+    assert asyncio.run(get_weather_cache().get(cache_key)) != stale_body
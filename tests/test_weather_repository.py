@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from benchmarks.payloads import make_timeline
+from extensions import db
+from models.weather import Weather
+from models.serialization import dumps, weather_dict_from_rows
+from service.bulk_writer import BulkWeatherWriter
+from service.history_repository import HistoryRepository
+from service.statement_counter import count_statements
+from service.upsert_writer import UpsertWeatherWriter
+from service.weather_repository import WeatherRepository
+from service.weather_stream import stream_weather_json
+
+
+@pytest.mark.parametrize("hourly_storage", ["rows", "compact"])
+def test_get_tree_matches_stored_rows_in_fixed_queries(session, hourly_storage):
+    weather_row, condition_rows, station_rows = BulkWeatherWriter(session, hourly_storage).save(
+        make_timeline(days=15), "cell:1"
+    )
+    session.expunge_all()
+
+    with count_statements(db.engine) as counter:
+        weather = WeatherRepository(session).get_tree(weather_row['id'])
+        tree = weather.to_dict()
+
+    assert counter.statements <= WeatherRepository.TREE_QUERIES
+    # to_dict() formats datetimes itself; the row path leaves them to the encoder
+    assert dumps(tree) == dumps(weather_dict_from_rows(weather_row, condition_rows, station_rows))
+    assert len(tree['days']) == 15
+    assert all(len(day['hours']) == 24 for day in tree['days'])
+
+
+def test_latest_for_location_returns_newest_forecast(session):
+    writer = BulkWeatherWriter(session)
+    writer.save(make_timeline(days=1, seed=1), "cell:1")
+    newest, _, _ = writer.save(make_timeline(days=1, seed=2), "cell:1")
+    writer.save(make_timeline(days=1, seed=3), "cell:2")
+    session.expunge_all()
+
+    repository = WeatherRepository(session)
+    assert repository.latest_for_location("cell:1").id == newest['id']
+    assert repository.latest_for_location("cell:3") is None
+
+
+@pytest.mark.parametrize("hourly_storage", ["rows", "compact"])
+def test_upserted_tree_reads_only_the_latest_fetch(session, hourly_storage):
+    writer = UpsertWeatherWriter(session, hourly_storage)
+    first = make_timeline(days=15)
+    writer.save(first, "cell:1")
+    # A day later the first day has left the forecast window
+    latest = {**first, 'days': first['days'][1:]}
+    weather_row, condition_rows, station_rows = writer.save(latest, "cell:1")
+    expected = dumps(weather_dict_from_rows(weather_row, condition_rows, station_rows))
+    session.expunge_all()
+
+    tree = WeatherRepository(session).get_tree(weather_row['id']).to_dict()
+    assert len(tree['days']) == 14
+    assert dumps(tree) == expected
+
+    streamed = json.loads(b"".join(stream_weather_json(weather_row['id'])))
+    assert streamed['data'] == json.loads(expected)
+
+    # The dropped day is still history
+    start = first['days'][0]['datetimeEpoch']
+    history = HistoryRepository(session).daily_aggregates("cell:1", start, start + 15 * 86400)
+    assert len(history) == 15
+
+
+@pytest.mark.parametrize("hourly_storage", ["rows", "compact"])
+def test_lazy_to_dict_loads_hourly_blocks_for_days_only(session, hourly_storage):
+    weather_row, _, _ = BulkWeatherWriter(session, hourly_storage).save(make_timeline(days=3), "cell:1")
+    session.expunge_all()
+    block_queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM hourly_block" in statement:
+            block_queries.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        tree = session.get(Weather, weather_row['id']).to_dict()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    # The lazy days relationship also holds the hour rows, which carry no hours of their own
+    days = [day for day in tree['days'] if day.get('hours')]
+    assert len(days) == 3
+    assert all(len(day['hours']) == 24 for day in days)
+    # At most one lookup per day, none per hour
+    assert len(block_queries) <= 3
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+from app import create_app
+from benchmarks.payloads import make_timeline
+from extensions import db, get_async_redis_client
+from models.serialization import weather_dict_from_rows
+from service.bootstrap import init_db
+from service.tiered_cache import get_weather_cache
+from service.weather_repository import WeatherRepository
+from service.weather_service import CACHE_HARD_TTL, CACHE_KEY_PREFIX, WeatherService, encode_body
+from service.write_behind import WriteBehindQueue, get_write_queue
+
+
+def test_hit_only_worker_drains_queued_writes(database_url, monkeypatch):
+    monkeypatch.setenv("WEATHER_WRITE_BEHIND", "1")
+    app = create_app({"SQLALCHEMY_DATABASE_URI": database_url, "RATELIMIT_ENABLED": False})
+    latitude, longitude = 12.9716, 77.5946
+    location_key, query_lat, query_long = WeatherService.key_scheme.cell(latitude, longitude)
+    cache_key = f"{CACHE_KEY_PREFIX}:{location_key}"
+
+    # Rows queued and body cached by another process, e.g. `prefetch-weather --once`
+    with app.app_context():
+        init_db()
+        service = WeatherService(get_async_redis_client())
+        rows = service.writer_class(db.session).build(make_timeline(query_lat, query_long), location_key)
+        body = encode_body(weather_dict_from_rows(*rows))
+    write_queue = get_write_queue()
+    assert not write_queue.consumer_started
+    assert asyncio.run(write_queue.enqueue(rows))
+    asyncio.run(get_weather_cache().set(cache_key, body, CACHE_HARD_TTL))
+
+    response = app.test_client().post("/api/v1/weather", json={"latitude": latitude, "longitiude": longitude})
+    assert response.status_code == 200
+    assert response.get_json()["status"] is True
+    assert write_queue.consumer_started
+
+    deadline = time.monotonic() + 10
+    with app.app_context():
+        while WeatherRepository(db.session).latest_id_for_location(location_key) is None:
+            assert time.monotonic() < deadline, "queued write was not drained"
+            db.session.remove()
+            time.sleep(0.05)
+    assert asyncio.run(write_queue.metrics())['depth'] == 0
+
+
+def test_undecodable_entries_are_dead_lettered(app):
+    redis_client = get_async_redis_client()
+    write_queue = WriteBehindQueue(redis_client, stream="weather:writes:undecodable", block_ms=50)
+    rows = WeatherService(redis_client).writer_class(db.session).build(make_timeline(days=1), "cell:1")
+    written = []
+
+    async def seed():
+        await redis_client.xadd(write_queue.stream, {'rows': b"{not json", 'attempts': 0})
+        await redis_client.xadd(write_queue.stream, {'rows': b"[1]", 'attempts': 0})
+        await redis_client.xadd(write_queue.stream, {'attempts': 0})
+        assert await write_queue.enqueue(rows)
+
+    asyncio.run(seed())
+    write_queue.ensure_consumer(app, written.extend)
+
+    deadline = time.monotonic() + 10
+    while asyncio.run(write_queue.metrics())['depth']:
+        assert time.monotonic() < deadline, "consumer stalled on undecodable entries"
+        time.sleep(0.05)
+    stats = asyncio.run(write_queue.metrics())
+    assert stats['dead_letters'] == 3
+    assert stats['retries'] == 0
+    assert [weather_row['id'] for weather_row, _, _ in written] == [rows[0]['id']]